@@ -14,17 +14,22 @@ import os
 import sqlite3
 import PIL.Image as Image
 import io
-import uuid
 import json
 from datetime import datetime
 
-from database import init_db, save_clothing_item, get_clothing_items, get_clothing_by_category, get_themes
-from database import save_outfit_feedback, get_outfit_feedback, get_top_rated_outfits
-from image_processor import remove_background, combine_outfit_images
-from classifier import classify_clothing
-from outfit_recommender import generate_outfit_recommendation
+from database import save_clothing_item, get_clothing_items_by_ids, get_themes
+from database import query_clothing_items, count_clothing_items, get_wardrobe_stats
+from database import save_outfit_feedback_bulk, get_outfit_feedback, get_top_rated_outfits
+from search_index import search_clothing_items
+from migrations import run_migrations
+from thumbnails import generate_thumbnails, get_thumbnail
+from background_jobs import start_background_worker, enqueue_background_removal, get_job_status
+from image_store import UPLOAD_FOLDER, PROCESSED_FOLDER, store_upload, stored_image_path, find_near_duplicates
 from utils import load_sample_images, allowed_file
 
+# NumPy, OpenCV and rembg are slow to import, so the modules that need them
+# are imported by the pages that use them rather than here
+
 # Initialize app
 st.set_page_config(
     page_title="FashionAIst",
@@ -33,8 +38,25 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize database
-init_db()
+# Bring the database schema up to date (a no-op on script reruns)
+run_migrations()
+
+# Background removal runs in worker processes, off the Streamlit script thread
+start_background_worker()
+
+# Number of items per page of the wardrobe grid
+WARDROBE_PAGE_SIZE = 12
+
+# Maximum number of ranked results shown for a wardrobe search
+WARDROBE_SEARCH_LIMIT = 48
+
+# Wardrobe sort options mapped to query_clothing_items sort orders
+WARDROBE_SORTS = {
+    "Newest First": "newest",
+    "Oldest First": "oldest",
+    "Name (A-Z)": "name_asc",
+    "Name (Z-A)": "name_desc"
+}
 
 # Load CSS
 def load_css():
@@ -93,8 +115,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Create necessary folders
-os.makedirs("uploaded_images", exist_ok=True)
-os.makedirs("processed_images", exist_ok=True)
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 
 # Sidebar menu
 st.sidebar.title("Menu")
@@ -164,6 +186,15 @@ if option == "Home":
     # Single spacer is sufficient
     st.markdown("<div style='height:40px;'></div>", unsafe_allow_html=True)
     
+    # Stock photos come from the local cache only; missing ones are fetched
+    # in the background and appear on a later visit
+    sample_images = load_sample_images("clothing items")
+    if sample_images:
+        sample_cols = st.columns(len(sample_images))
+        for col, image in zip(sample_cols, sample_images):
+            with col:
+                st.image(image, caption="", use_container_width=True)
+    
     # Call to action with pulsing animation
     st.markdown("""
     <div class="pulse" style="background:linear-gradient(135deg, #AEC6CF, #1E6B8C); padding:25px; border-radius:12px; margin-top:40px; text-align:center; box-shadow:0 10px 20px rgba(0,0,0,0.1);">
@@ -175,6 +206,8 @@ if option == "Home":
 
 # Upload to Wardrobe page
 elif option == "Upload to Wardrobe":
+    from feature_store import get_features
+    
     st.markdown("""
     <div class="fade-in-up" style="background:linear-gradient(135deg, #E8F4F8, #c7e6f0); padding:25px; border-radius:15px; margin-bottom:25px; border:2px solid #AEC6CF; box-shadow:0 10px 20px rgba(0,0,0,0.05);">
         <h2 style="color:#1E6B8C; text-align:center; font-weight:700; letter-spacing:1px;">Add to Your Digital Wardrobe</h2>
@@ -270,18 +303,26 @@ elif option == "Upload to Wardrobe":
         if save_btn:
             with st.spinner("Saving your item..."):
                 try:
-                    # Generate unique filename
-                    filename = f"{uuid.uuid4()}.png"
-                    upload_path = os.path.join("uploaded_images", filename)
-                    processed_path = os.path.join("processed_images", filename)
+                    # Store the image once, named after the hash of its pixels
+                    filename, image_hash, image_phash, is_new_image = store_upload(image)
                     
-                    # Create directories if they don't exist
-                    os.makedirs("uploaded_images", exist_ok=True)
-                    os.makedirs("processed_images", exist_ok=True)
-                    
-                    # Save original image to both locations (no background removal)
-                    image.save(upload_path)
-                    image.save(processed_path)  # Save same image to processed folder for compatibility
+                    if is_new_image:
+                        # Precompute the thumbnails shown until the processed image is ready
+                        generate_thumbnails(os.path.join(UPLOAD_FOLDER, filename))
+                        
+                        # Store the classifier features so they are never recomputed from the image
+                        get_features(image_hash, image)
+                        
+                        # Queue background removal instead of blocking this request
+                        st.session_state.bg_job_id = enqueue_background_removal(filename)
+                        
+                        # Point out existing items that look very similar
+                        similar_items = find_near_duplicates(image_phash)
+                        if similar_items:
+                            st.info("👀 Looks similar to: " + ", ".join(name for _, name, _ in similar_items[:3]))
+                    else:
+                        # Same picture as an existing item: reuse its stored and processed image
+                        st.info("♻️ This photo is already in your wardrobe, so its stored image was reused.")
                     
                     # Combine colors
                     color_info = {
@@ -291,16 +332,16 @@ elif option == "Upload to Wardrobe":
                         "section": selected_section  # Add section here for better filtering
                     }
                     
-                    # Additional details
+                    # Additional details, stored with the color info so they can be indexed
                     additional_info = {
                         "brand": brand,
                         "section": selected_section,
                         "seasons": season
                     }
+                    color_info.update(additional_info)
                     
-                    # Convert to JSON strings
+                    # Convert to JSON string
                     color_json = json.dumps(color_info)
-                    additional_json = json.dumps(additional_info)
                     
                     # Make occasion a list if it isn't already
                     if not isinstance(occasion, list):
@@ -310,7 +351,9 @@ elif option == "Upload to Wardrobe":
                             occasion = []
                     
                     # Save to database
-                    save_clothing_item(name, selected_category, color_json, occasion, filename)
+                    save_clothing_item(name, selected_category, color_json, occasion, filename,
+                                       section=selected_section, brand=brand, seasons=season,
+                                       content_hash=image_hash, phash=image_phash, image_size=image.size)
                     
                     # Display success message
                     st.success("✅ Item successfully added to your digital wardrobe!")
@@ -328,6 +371,21 @@ elif option == "Upload to Wardrobe":
                 except Exception as e:
                     st.error(f"Error saving item: {str(e)}")
                     st.info("Please try again or contact support if the problem persists.")
+    
+    # Background removal status of the last upload
+    if st.session_state.get("bg_job_id"):
+        job_status = get_job_status(st.session_state.bg_job_id)
+        if job_status in ("pending", "running"):
+            status_col1, status_col2 = st.columns([3, 1])
+            with status_col1:
+                st.info("🪄 Removing the background from your last upload...")
+            with status_col2:
+                if st.button("🔄 Check status"):
+                    st.rerun()
+        elif job_status == "done":
+            st.success("✨ Background removed from your last upload!")
+        elif job_status == "failed":
+            st.warning("Background removal failed for your last upload, so the original image was kept.")
 
 # My Digital Wardrobe page
 elif option == "My Digital Wardrobe":
@@ -339,8 +397,8 @@ elif option == "My Digital Wardrobe":
     </div>
     """, unsafe_allow_html=True)
     
-    # Get all clothing items
-    items = get_clothing_items()
+    # Precomputed counts per category and section
+    stats = get_wardrobe_stats()
     
     # Filters container with better styling
     with st.container():
@@ -356,21 +414,11 @@ elif option == "My Digital Wardrobe":
         filter_col1, filter_col2, filter_col3 = st.columns(3)
         
         with filter_col1:
-            categories = ["All"] + list(set([item[2] for item in items if item[2]]))
+            categories = ["All"] + sorted(stats["category"])
             selected_category = st.selectbox("Category", categories)
         
         with filter_col2:
-            # Extract sections from items (requires color to be JSON with additional_info)
-            sections = ["All"]
-            for item in items:
-                try:
-                    if item[3]:  # Color field might contain the JSON with section info
-                        color_data = json.loads(item[3])
-                        if isinstance(color_data, dict) and "section" in color_data:
-                            if color_data["section"] not in sections:
-                                sections.append(color_data["section"])
-                except:
-                    pass
+            sections = ["All"] + sorted(stats["section"])
             
             if len(sections) == 1:  # Only "All" exists
                 sections += ["Everyday Wear", "Work Attire", "Party Outfit", "Seasonal", "Traditional"]
@@ -379,7 +427,7 @@ elif option == "My Digital Wardrobe":
         
         with filter_col3:
             # Add sorting options
-            sort_options = ["Newest First", "Oldest First", "Name (A-Z)", "Name (Z-A)"]
+            sort_options = list(WARDROBE_SORTS)
             sort_by = st.selectbox("Sort By", sort_options)
     
     # Search bar with icon
@@ -390,66 +438,50 @@ elif option == "My Digital Wardrobe":
         st.markdown("<br>", unsafe_allow_html=True)
         clear_filters = st.button("Clear Filters")
     
-    # Apply filters
-    filtered_items = items
+    # Reset pagination whenever the filters change
+    filter_key = (selected_category, selected_section, search_query, sort_by)
+    if clear_filters or st.session_state.get("wardrobe_filter_key") != filter_key:
+        st.session_state.wardrobe_filter_key = filter_key
+        st.session_state.wardrobe_page_cursors = [None]
+    page_cursors = st.session_state.wardrobe_page_cursors
     
-    # Apply category filter
-    if selected_category != "All":
-        filtered_items = [item for item in filtered_items if item[2] == selected_category]
+    filters = {
+        "category": selected_category if selected_category != "All" else None,
+        "section": selected_section if selected_section != "All" else None
+    }
     
-    # Apply section filter
-    if selected_section != "All":
-        section_filtered = []
-        for item in filtered_items:
-            try:
-                if item[3]:  # Color field
-                    color_data = json.loads(item[3])
-                    if isinstance(color_data, dict) and "section" in color_data:
-                        if color_data["section"] == selected_section:
-                            section_filtered.append(item)
-                    else:
-                        # If no section info found, keep the item when filtering by "Everyday Wear"
-                        if selected_section == "Everyday Wear":
-                            section_filtered.append(item)
-            except:
-                # If error parsing, keep the item when filtering by "Everyday Wear"
-                if selected_section == "Everyday Wear":
-                    section_filtered.append(item)
-        filtered_items = section_filtered
-    
-    # Apply search filter
     if search_query:
-        search_filtered = []
-        query = search_query.lower()
-        for item in filtered_items:
-            item_id, name, category, color, occasion, filename, date_added = item
-            # Search in name, category, and color
-            if (query in name.lower() or 
-                query in category.lower() or 
-                (color and query in color.lower())):
-                search_filtered.append(item)
-        filtered_items = search_filtered
-    
-    # Apply sorting
-    if sort_by == "Newest First":
-        # Already sorted by date_added DESC from database
-        pass
-    elif sort_by == "Oldest First":
-        filtered_items = sorted(filtered_items, key=lambda x: x[6])  # date_added is at index 6
-    elif sort_by == "Name (A-Z)":
-        filtered_items = sorted(filtered_items, key=lambda x: x[1].lower())  # name is at index 1
-    elif sort_by == "Name (Z-A)":
-        filtered_items = sorted(filtered_items, key=lambda x: x[1].lower(), reverse=True)
+        # Ranked search results, restricted to the selected category and section
+        filtered_items = search_clothing_items(search_query, limit=WARDROBE_SEARCH_LIMIT, **filters)
+        next_cursor = None
+        total_items = len(filtered_items)
+    else:
+        # Filter, sort and paginate in the database
+        filtered_items, next_cursor = query_clothing_items(
+            sort=WARDROBE_SORTS[sort_by],
+            limit=WARDROBE_PAGE_SIZE,
+            after=page_cursors[-1],
+            **filters
+        )
+        # Counts for a single filter come straight from the statistics table
+        if filters["category"] and filters["section"]:
+            total_items = count_clothing_items(**filters)
+        elif filters["category"]:
+            total_items = stats["category"].get(filters["category"], 0)
+        elif filters["section"]:
+            total_items = stats["section"].get(filters["section"], 0)
+        else:
+            total_items = stats["total"]
     
     # Display items header with count - styled better
     st.markdown(f"""
     <div class="staggered-animation styled-border" style="background-color:#FFFFFF; padding:20px; border-radius:12px; margin:30px 0 20px; box-shadow:0 6px 12px rgba(0,0,0,0.08); border-left:4px solid #1E6B8C; display:flex; justify-content:space-between; align-items:center;">
         <div>
             <h4 style="color:#1E6B8C; font-weight:600; margin-bottom:5px;">Your Clothing Collection</h4>
-            <p style="font-size:14px; color:#666; font-style:italic;">Showing {len(filtered_items)} items in your wardrobe</p>
+            <p style="font-size:14px; color:#666; font-style:italic;">Showing {len(filtered_items)} of {total_items} items in your wardrobe</p>
         </div>
         <div style="background-color:#E8F4F8; border-radius:20px; padding:5px 15px; border:1px solid #AEC6CF;">
-            <span style="font-weight:bold; color:#1E6B8C;">{len(filtered_items)}</span>
+            <span style="font-weight:bold; color:#1E6B8C;">{total_items}</span>
             <span style="color:#666; font-size:14px;"> items</span>
         </div>
     </div>
@@ -469,29 +501,10 @@ elif option == "My Digital Wardrobe":
         st.info("💡 Tip: Click on 'Upload to Wardrobe' in the menu to add your first clothing item!")
     else:
         cols = st.columns(3)
-    
-    for i, item in enumerate(filtered_items):
-        st.write(f"Debug - Item {i}: {item}")
-        st.write(f"Length of item {i}: {len(item)}")
-
-        try:
-            # Unpack only the first 7 elements to avoid ValueError
-            item_id, name, category, color, occasion, filename, date_added, tags = item
-        except ValueError:
-            st.warning(f"Skipping item {i} due to unexpected structure: {item}")
-            continue
-
-        img_path = os.path.join("processed_images", filename)
-
-        try:
-            with cols[i % 3]:
-                # Create an enhanced card (your existing UI rendering logic here)
-                ...
-        except Exception as e:
-            st.error(f"Error displaying item {i}: {e}")
-
-
-            img_path = os.path.join("processed_images", filename)
+        
+        for i, item in enumerate(filtered_items):
+            item_id, name, category, color, occasion, filename, date_added = item
+            img_path = stored_image_path(filename)
             
             try:
                 with cols[i % 3]:
@@ -513,8 +526,7 @@ elif option == "My Digital Wardrobe":
                     """, unsafe_allow_html=True)
                     
                     if os.path.exists(img_path):
-                        img = Image.open(img_path)
-                        st.image(img, caption="", use_container_width=True)
+                        st.image(get_thumbnail(img_path, "grid"), caption="", use_container_width=True)
                     else:
                         st.error("Image not available")
                     
@@ -575,9 +587,25 @@ elif option == "My Digital Wardrobe":
                     """, unsafe_allow_html=True)
             except Exception as e:
                 st.error(f"Error displaying item: {str(e)}")
+        
+        # Pagination controls
+        page_col1, page_col2, page_col3 = st.columns([1, 2, 1])
+        with page_col1:
+            if len(page_cursors) > 1 and st.button("← Previous"):
+                page_cursors.pop()
+                st.rerun()
+        with page_col2:
+            st.markdown(f"<p style='text-align:center; color:#666;'>Page {len(page_cursors)}</p>", unsafe_allow_html=True)
+        with page_col3:
+            if next_cursor is not None and st.button("Next →"):
+                page_cursors.append(next_cursor)
+                st.rerun()
 
 # Get Outfit Recommendations page
 elif option == "Get Outfit Recommendations":
+    from outfit_recommender import generate_outfit_recommendation
+    from composite_cache import get_outfit_composite
+    
     st.markdown("""
     <div class="fade-in-up" style="background:linear-gradient(135deg, #E8F4F8, #c7e6f0); padding:25px; border-radius:15px; margin-bottom:25px; border:2px solid #AEC6CF; box-shadow:0 10px 20px rgba(0,0,0,0.05);">
         <h2 style="color:#1E6B8C; text-align:center; font-weight:700; letter-spacing:1px;">Outfit Recommendations</h2>
@@ -668,248 +696,263 @@ elif option == "Get Outfit Recommendations":
             with st.spinner("Creating stylish outfits for you..."):
                 # Get recommendations using feedback if selected
                 outfits = generate_outfit_recommendation(selected_theme, num_recommendations, use_feedback)
+            
+            # Keep the outfits for the reruns triggered by the feedback widgets
+            previous = st.session_state.get("outfit_results")
+            st.session_state.outfit_results = {
+                "id": previous["id"] + 1 if previous else 0,
+                "theme": selected_theme,
+                "outfits": outfits,
+                "feedback_saved": False
+            }
+        
+        outfit_results = st.session_state.get("outfit_results")
+        if outfit_results is not None:
+            outfits = outfit_results["outfits"]
+            result_theme = outfit_results["theme"]
+            if not outfits:
+                # Better error message with styling
+                st.markdown("""
+                <div style="background-color:#FFF3CD; padding:20px; border-radius:10px; margin:20px 0; border-left:5px solid #FFD700;">
+                    <h4 style="color:#856404; margin-top:0">Limited Wardrobe Variety</h4>
+                    <p>We couldn't generate outfits for this theme with your current wardrobe items. Try adding more variety to your collection.</p>
+                    <p><strong>Suggestion:</strong> Add more tops, bottoms, and accessories that match the selected theme.</p>
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                # Enhanced header for results with animation
+                st.markdown(f"""
+                <div class="fade-in-up" style="background:linear-gradient(135deg, #E8F4F8, #c7e6f0); padding:20px; border-radius:15px; margin:30px 0; border:2px solid #AEC6CF; box-shadow:0 10px 20px rgba(0,0,0,0.05);">
+                    <h3 style="color:#1E6B8C; text-align:center; margin:0; font-weight:700; letter-spacing:0.5px;">
+                        {len(outfits)} Outfit Suggestions for "{result_theme}" Theme
+                    </h3>
+                    <div style="width:80px; height:3px; background-color:#1E6B8C; margin:15px auto; border-radius:3px;"></div>
+                    <p style="text-align:center; font-size:14px; margin:0; color:#444;">
+                        Swipe through your personalized outfit recommendations below
+                    </p>
+                </div>
+                """, unsafe_allow_html=True)
                 
-                if not outfits:
-                    # Better error message with styling
-                    st.markdown("""
-                    <div style="background-color:#FFF3CD; padding:20px; border-radius:10px; margin:20px 0; border-left:5px solid #FFD700;">
-                        <h4 style="color:#856404; margin-top:0">Limited Wardrobe Variety</h4>
-                        <p>We couldn't generate outfits for this theme with your current wardrobe items. Try adding more variety to your collection.</p>
-                        <p><strong>Suggestion:</strong> Add more tops, bottoms, and accessories that match the selected theme.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    # Enhanced header for results with animation
+                # Resolve the items of every outfit in a single query
+                outfit_item_map = get_clothing_items_by_ids([item_id for outfit in outfits for item_id in outfit])
+                
+                # Display each outfit in an enhanced card-like container with staggered animation
+                for i, outfit in enumerate(outfits):
+                    # Create an outfit card with improved styling and animation
                     st.markdown(f"""
-                    <div class="fade-in-up" style="background:linear-gradient(135deg, #E8F4F8, #c7e6f0); padding:20px; border-radius:15px; margin:30px 0; border:2px solid #AEC6CF; box-shadow:0 10px 20px rgba(0,0,0,0.05);">
-                        <h3 style="color:#1E6B8C; text-align:center; margin:0; font-weight:700; letter-spacing:0.5px;">
-                            {len(outfits)} Outfit Suggestions for "{selected_theme}" Theme
-                        </h3>
-                        <div style="width:80px; height:3px; background-color:#1E6B8C; margin:15px auto; border-radius:3px;"></div>
-                        <p style="text-align:center; font-size:14px; margin:0; color:#444;">
-                            Swipe through your personalized outfit recommendations below
-                        </p>
+                    <div class="staggered-animation" style="background:linear-gradient(to bottom, #FFFFFF, #F8F9FA); padding:25px; border-radius:12px; margin-bottom:40px; border:1px solid #E0E0E0; box-shadow:0 8px 16px rgba(0,0,0,0.05);">
+                        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px; border-bottom:2px solid #E8F4F8; padding-bottom:15px;">
+                            <h4 style="color:#1E6B8C; margin:0; font-weight:600;">Outfit {i+1}</h4>
+                            <span style="background-color:#E8F4F8; color:#1E6B8C; padding:5px 12px; border-radius:20px; font-size:12px; font-weight:bold;">{result_theme} Theme</span>
+                        </div>
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    # Display each outfit in an enhanced card-like container with staggered animation
-                    for i, outfit in enumerate(outfits):
-                        # Create an outfit card with improved styling and animation
-                        st.markdown(f"""
-                        <div class="staggered-animation" style="background:linear-gradient(to bottom, #FFFFFF, #F8F9FA); padding:25px; border-radius:12px; margin-bottom:40px; border:1px solid #E0E0E0; box-shadow:0 8px 16px rgba(0,0,0,0.05);">
-                            <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px; border-bottom:2px solid #E8F4F8; padding-bottom:15px;">
-                                <h4 style="color:#1E6B8C; margin:0; font-weight:600;">Outfit {i+1}</h4>
-                                <span style="background-color:#E8F4F8; color:#1E6B8C; padding:5px 12px; border-radius:20px; font-size:12px; font-weight:bold;">{selected_theme} Theme</span>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    # Get items for this outfit
+                    outfit_items = [outfit_item_map[item_id] for item_id in outfit if item_id in outfit_item_map]
+                    
+                    # Display outfit items
+                    if outfit_items:
+                        # Create columns for the combined outfit and individual items
+                        main_col1, main_col2 = st.columns([2, 3])
                         
-                        # Get items for this outfit
-                        outfit_items = []
-                        for item_id in outfit:
-                            # Get items by their category
-                            category_items = get_clothing_by_category(item_id)
-                            if category_items:
-                                outfit_items.append(category_items[0])
+                        with main_col1:
+                            # Display the combined outfit, built once per item set and cached
+                            combined_outfit = get_outfit_composite(outfit_items)
+                            st.image(combined_outfit, caption="Combined Look", use_container_width=True)
                         
-                        # Display outfit items
-                        if outfit_items:
-                            # Create columns for the combined outfit and individual items
-                            main_col1, main_col2 = st.columns([2, 3])
+                        with main_col2:
+                            # Header for items
+                            st.markdown("""
+                            <div style="background-color:#F0F8FF; padding:8px; border-radius:6px; margin-bottom:10px;">
+                                <h5 style="color:#1E6B8C; margin:0; font-size:16px;">Outfit Components</h5>
+                            </div>
+                            """, unsafe_allow_html=True)
                             
-                            with main_col1:
-                                # Create and display combined outfit
-                                image_paths = [os.path.join("processed_images", item[5]) for item in outfit_items]
-                                combined_outfit = combine_outfit_images(image_paths)
-                                st.image(combined_outfit, caption="Combined Look", use_container_width=True)
+                            # Display individual items in a horizontal scroll container
+                            st.markdown("""
+                            <style>
+                            .scroll-container {
+                                display: flex;
+                                flex-wrap: nowrap;
+                                overflow-x: auto;
+                                padding: 10px 0;
+                                gap: 15px;
+                            }
+                            .item-card {
+                                min-width: 150px;
+                                border: 1px solid #e0e0e0;
+                                border-radius: 8px;
+                                padding: 10px;
+                                background-color: white;
+                                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+                            }
+                            </style>
+                            <div class="scroll-container">
+                            """, unsafe_allow_html=True)
                             
-                            with main_col2:
-                                # Header for items
-                                st.markdown("""
-                                <div style="background-color:#F0F8FF; padding:8px; border-radius:6px; margin-bottom:10px;">
-                                    <h5 style="color:#1E6B8C; margin:0; font-size:16px;">Outfit Components</h5>
-                                </div>
-                                """, unsafe_allow_html=True)
+                            # Create HTML for each item
+                            item_cards_html = ""
+                            for j, item in enumerate(outfit_items):
+                                _, name, category, color, _, filename, _ = item
+                                img_path = stored_image_path(filename)
                                 
-                                # Display individual items in a horizontal scroll container
-                                st.markdown("""
-                                <style>
-                                .scroll-container {
-                                    display: flex;
-                                    flex-wrap: nowrap;
-                                    overflow-x: auto;
-                                    padding: 10px 0;
-                                    gap: 15px;
-                                }
-                                .item-card {
-                                    min-width: 150px;
-                                    border: 1px solid #e0e0e0;
-                                    border-radius: 8px;
-                                    padding: 10px;
-                                    background-color: white;
-                                    box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-                                }
-                                </style>
-                                <div class="scroll-container">
-                                """, unsafe_allow_html=True)
+                                if os.path.exists(img_path):
+                                    # We can't directly insert the image into HTML, so we'll place items conventionally
+                                    item_cards_html += f"""
+                                    <div class="item-card">
+                                        <p style="font-weight:bold; color:#1E6B8C; margin:0 0 5px 0; text-align:center;">
+                                            {category}
+                                        </p>
+                                    </div>
+                                    """
+                            
+                            st.markdown(item_cards_html + "</div>", unsafe_allow_html=True)
+                            
+                            # Now add the images conventionally
+                            cols = st.columns(len(outfit_items))
+                            for j, item in enumerate(outfit_items):
+                                _, name, category, color, _, filename, _ = item
+                                img_path = stored_image_path(filename)
                                 
-                                # Create HTML for each item
-                                item_cards_html = ""
-                                for j, item in enumerate(outfit_items):
-                                    _, name, category, color, _, filename, _ = item
-                                    img_path = os.path.join("processed_images", filename)
-                                    
+                                with cols[j]:
                                     if os.path.exists(img_path):
-                                        # We can't directly insert the image into HTML, so we'll place items conventionally
-                                        item_cards_html += f"""
-                                        <div class="item-card">
-                                            <p style="font-weight:bold; color:#1E6B8C; margin:0 0 5px 0; text-align:center;">
-                                                {category}
-                                            </p>
-                                        </div>
-                                        """
-                                
-                                st.markdown(item_cards_html + "</div>", unsafe_allow_html=True)
-                                
-                                # Now add the images conventionally
-                                cols = st.columns(len(outfit_items))
-                                for j, item in enumerate(outfit_items):
-                                    _, name, category, color, _, filename, _ = item
-                                    img_path = os.path.join("processed_images", filename)
-                                    
-                                    with cols[j]:
-                                        if os.path.exists(img_path):
-                                            img = Image.open(img_path)
-                                            st.image(img, caption=f"{name}", use_container_width=True)
-                                            st.caption(f"{category}")
-                            
-                            # Add a separator between outfits
-                            st.markdown("<hr style='margin:30px 0; opacity:0.2;'>", unsafe_allow_html=True)
+                                        st.image(get_thumbnail(img_path, "grid"), caption=f"{name}", use_container_width=True)
+                                        st.caption(f"{category}")
                         
-                    # Enhanced feedback section with animation
+                        # Add a separator between outfits
+                        st.markdown("<hr style='margin:30px 0; opacity:0.2;'>", unsafe_allow_html=True)
+                    
+                # Enhanced feedback section with animation
+                st.markdown("""
+                <div class="fade-in-up" style="background:linear-gradient(135deg, #E8F4F8, #c7e6f0); padding:25px; border-radius:15px; margin:40px 0 25px; border:2px solid #AEC6CF; box-shadow:0 10px 20px rgba(0,0,0,0.05);">
+                    <h3 style="color:#1E6B8C; text-align:center; margin:0; font-weight:700; letter-spacing:0.5px;">
+                        How were your outfit recommendations?
+                    </h3>
+                    <div style="width:80px; height:3px; background-color:#1E6B8C; margin:15px auto; border-radius:3px;"></div>
+                    <p style="text-align:center; font-size:15px; margin:0; color:#444; line-height:1.5;">
+                        Your feedback helps us understand your style preferences and create<br>better personalized recommendations just for you
+                    </p>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                # Create columns for feedback layout
+                feedback_col1, feedback_col2 = st.columns([2, 3])
+                
+                with feedback_col1:
+                    # Enhanced rating section
                     st.markdown("""
-                    <div class="fade-in-up" style="background:linear-gradient(135deg, #E8F4F8, #c7e6f0); padding:25px; border-radius:15px; margin:40px 0 25px; border:2px solid #AEC6CF; box-shadow:0 10px 20px rgba(0,0,0,0.05);">
-                        <h3 style="color:#1E6B8C; text-align:center; margin:0; font-weight:700; letter-spacing:0.5px;">
-                            How were your outfit recommendations?
-                        </h3>
-                        <div style="width:80px; height:3px; background-color:#1E6B8C; margin:15px auto; border-radius:3px;"></div>
-                        <p style="text-align:center; font-size:15px; margin:0; color:#444; line-height:1.5;">
-                            Your feedback helps us understand your style preferences and create<br>better personalized recommendations just for you
-                        </p>
+                    <div class="slide-in-left styled-border" style="background-color:#FFFFFF; padding:18px; border-radius:12px; margin-bottom:15px; box-shadow:0 6px 12px rgba(0,0,0,0.08); border-left:4px solid #1E6B8C;">
+                        <h5 style="color:#1E6B8C; margin:0; font-weight:600;">Rate Your Experience</h5>
+                        <p style="font-size:13px; color:#666; margin-top:5px; font-style:italic;">How well did we match your style?</p>
+                        <div style="height:3px; width:50px; background-color:#AEC6CF; margin-top:10px; border-radius:2px;"></div>
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    # Create columns for feedback layout
-                    feedback_col1, feedback_col2 = st.columns([2, 3])
+                    # Visual star rating with emoji
+                    st.markdown("""
+                    <div style="text-align:center; padding:10px; background-color:#f8f9fa; border-radius:8px; margin:15px 0;">
+                        <p style="margin:0; color:#666; font-size:14px;">Select your rating below:</p>
+                    </div>
+                    """, unsafe_allow_html=True)
                     
-                    with feedback_col1:
-                        # Enhanced rating section
-                        st.markdown("""
-                        <div class="slide-in-left styled-border" style="background-color:#FFFFFF; padding:18px; border-radius:12px; margin-bottom:15px; box-shadow:0 6px 12px rgba(0,0,0,0.08); border-left:4px solid #1E6B8C;">
-                            <h5 style="color:#1E6B8C; margin:0; font-weight:600;">Rate Your Experience</h5>
-                            <p style="font-size:13px; color:#666; margin-top:5px; font-style:italic;">How well did we match your style?</p>
-                            <div style="height:3px; width:50px; background-color:#AEC6CF; margin-top:10px; border-radius:2px;"></div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Visual star rating with emoji
-                        st.markdown("""
-                        <div style="text-align:center; padding:10px; background-color:#f8f9fa; border-radius:8px; margin:15px 0;">
-                            <p style="margin:0; color:#666; font-size:14px;">Select your rating below:</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Add star rating with better styling
-                        rating = st.slider("Your rating", 1, 5, 3, 
-                                         help="1 = Not helpful, 5 = Perfect recommendations",
-                                         label_visibility="collapsed")
-                        
-                        # Visual representation of rating
-                        star_display = "⭐" * rating
-                        st.markdown(f"""
-                        <div style="text-align:center; margin:5px 0 15px;">
-                            <span style="font-size:24px;">{star_display}</span>
-                            <p style="margin:10px 0 0; font-size:14px; color:#666;">
-                                {rating}/5 stars
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                    with feedback_col2:
-                        # Enhanced comments section
-                        st.markdown("""
-                        <div class="slide-in-left styled-border" style="background-color:#FFFFFF; padding:18px; border-radius:12px; margin-bottom:15px; box-shadow:0 6px 12px rgba(0,0,0,0.08); border-left:4px solid #1E6B8C;">
-                            <h5 style="color:#1E6B8C; margin:0; font-weight:600;">Share Your Thoughts</h5>
-                            <p style="font-size:13px; color:#666; margin-top:5px; font-style:italic;">Tell us what you liked or how we can improve</p>
-                            <div style="height:3px; width:50px; background-color:#AEC6CF; margin-top:10px; border-radius:2px;"></div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Feedback suggestions
-                        st.markdown("""
-                        <div style="display:flex; gap:8px; flex-wrap:wrap; margin-bottom:15px;">
-                            <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Great combinations!</span>
-                            <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Colors don't match my style</span>
-                            <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Perfect for the occasion</span>
-                            <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Need more accessories</span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Enhanced text area
-                        feedback_text = st.text_area("Share your thoughts (optional)",
-                                                  placeholder="What did you like or dislike about these recommendations? Any specific items that worked well together?",
-                                                  height=120,
-                                                  label_visibility="collapsed")
-                        
-                        st.caption("Your detailed feedback helps us improve our recommendations algorithm")
+                    # One rating per outfit, so every feedback record holds items worn together
+                    ratings = {}
+                    for i in range(len(outfits)):
+                        rating = st.select_slider(f"Outfit {i+1}", options=["Not rated", 1, 2, 3, 4, 5],
+                                                  value="Not rated",
+                                                  help="1 = Not helpful, 5 = Perfect recommendation",
+                                                  key=f"outfit_rating_{outfit_results['id']}_{i}")
+                        if rating != "Not rated":
+                            ratings[i] = rating
+                            
+                            # Visual representation of rating
+                            st.markdown(f"""
+                            <div style="text-align:center; margin:5px 0 15px;">
+                                <span style="font-size:24px;">{"⭐" * rating}</span>
+                                <p style="margin:10px 0 0; font-size:14px; color:#666;">
+                                    {rating}/5 stars
+                                </p>
+                            </div>
+                            """, unsafe_allow_html=True)
+                    
+                with feedback_col2:
+                    # Enhanced comments section
+                    st.markdown("""
+                    <div class="slide-in-left styled-border" style="background-color:#FFFFFF; padding:18px; border-radius:12px; margin-bottom:15px; box-shadow:0 6px 12px rgba(0,0,0,0.08); border-left:4px solid #1E6B8C;">
+                        <h5 style="color:#1E6B8C; margin:0; font-weight:600;">Share Your Thoughts</h5>
+                        <p style="font-size:13px; color:#666; margin-top:5px; font-style:italic;">Tell us what you liked or how we can improve</p>
+                        <div style="height:3px; width:50px; background-color:#AEC6CF; margin-top:10px; border-radius:2px;"></div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Feedback suggestions
+                    st.markdown("""
+                    <div style="display:flex; gap:8px; flex-wrap:wrap; margin-bottom:15px;">
+                        <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Great combinations!</span>
+                        <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Colors don't match my style</span>
+                        <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Perfect for the occasion</span>
+                        <span style="background:#f0f4f8; padding:5px 10px; border-radius:15px; font-size:12px; color:#555;">Need more accessories</span>
+                    </div>
+                    """, unsafe_allow_html=True)
                     
-                    # Submit button with enhanced styling
-                    st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-                    feedback_btn_col1, feedback_btn_col2, feedback_btn_col3 = st.columns([1, 2, 1])
-                    with feedback_btn_col2:
-                        submit_feedback = st.button("💫 Submit Feedback", 
-                                                 type="primary",
-                                                 use_container_width=True)
+                    # Enhanced text area
+                    feedback_text = st.text_area("Share your thoughts (optional)",
+                                              placeholder="What did you like or dislike about these recommendations? Any specific items that worked well together?",
+                                              height=120,
+                                              key=f"outfit_feedback_text_{outfit_results['id']}",
+                                              label_visibility="collapsed")
                     
-                    if submit_feedback:
+                    st.caption("Your detailed feedback helps us improve our recommendations algorithm")
+                
+                # Submit button with enhanced styling
+                st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
+                feedback_btn_col1, feedback_btn_col2, feedback_btn_col3 = st.columns([1, 2, 1])
+                with feedback_btn_col2:
+                    submit_feedback = st.button("💫 Submit Feedback", 
+                                             type="primary",
+                                             disabled=outfit_results["feedback_saved"],
+                                             use_container_width=True)
+                
+                if outfit_results["feedback_saved"]:
+                    st.success("Thank you for your feedback! We'll use it to improve your future recommendations.")
+                elif submit_feedback:
+                    if not ratings:
+                        st.warning("Rate at least one outfit before submitting your feedback.")
+                    else:
                         try:
-                            # Get all outfit item IDs to save
-                            all_outfit_item_ids = []
-                            for outfit in outfits:
-                                outfit_item_ids = []
-                                for item_id in outfit:
-                                    # Get actual item IDs from categories
-                                    category_items = get_clothing_by_category(item_id)
-                                    if category_items and len(category_items) > 0:
-                                        outfit_item_ids.append(category_items[0][0])  # First item's ID
-                                
+                            # One record per rated outfit; items were already resolved when the outfits were rendered
+                            feedback = []
+                            for i, rating in ratings.items():
+                                outfit_item_ids = [item_id for item_id in outfits[i] if item_id in outfit_item_map]
                                 if outfit_item_ids:
-                                    all_outfit_item_ids.extend(outfit_item_ids)
+                                    feedback.append((outfit_item_ids, result_theme, rating, feedback_text))
                             
                             # Save feedback to database
-                            save_outfit_feedback(all_outfit_item_ids, selected_theme, rating, feedback_text)
+                            save_outfit_feedback_bulk(feedback)
+                            outfit_results["feedback_saved"] = True
                             
                             # Success message
                             st.success("Thank you for your feedback! We'll use it to improve your future recommendations.")
                             
                         except Exception as e:
                             st.error(f"Error saving feedback: {str(e)}")
-                    
-                    # Enhanced call to action at the end with animation
-                    st.markdown("""
-                    <div class="pulse" style="background:linear-gradient(135deg, #AEC6CF, #1E6B8C); padding:25px; border-radius:12px; margin-top:40px; text-align:center; box-shadow:0 10px 20px rgba(0,0,0,0.1);">
-                        <h3 style="color:white; margin-bottom:10px; font-weight:700; letter-spacing:1px;">Want to explore more?</h3>
-                        <p style="color:white; font-size:16px; margin-bottom:20px; line-height:1.6;">
-                            Try different themes or add more items to your wardrobe to discover<br>exciting new outfit combinations!
-                        </p>
-                        <div style="display:flex; justify-content:center; gap:20px; flex-wrap:wrap;">
-                            <div style="background:rgba(255,255,255,0.2); padding:10px 20px; border-radius:50px; backdrop-filter:blur(5px);">
-                                <span style="color:white; font-size:14px;">🔄 Try another theme</span>
-                            </div>
-                            <div style="background:rgba(255,255,255,0.2); padding:10px 20px; border-radius:50px; backdrop-filter:blur(5px);">
-                                <span style="color:white; font-size:14px;">👕 Add more clothing</span>
-                            </div>
+                
+                # Enhanced call to action at the end with animation
+                st.markdown("""
+                <div class="pulse" style="background:linear-gradient(135deg, #AEC6CF, #1E6B8C); padding:25px; border-radius:12px; margin-top:40px; text-align:center; box-shadow:0 10px 20px rgba(0,0,0,0.1);">
+                    <h3 style="color:white; margin-bottom:10px; font-weight:700; letter-spacing:1px;">Want to explore more?</h3>
+                    <p style="color:white; font-size:16px; margin-bottom:20px; line-height:1.6;">
+                        Try different themes or add more items to your wardrobe to discover<br>exciting new outfit combinations!
+                    </p>
+                    <div style="display:flex; justify-content:center; gap:20px; flex-wrap:wrap;">
+                        <div style="background:rgba(255,255,255,0.2); padding:10px 20px; border-radius:50px; backdrop-filter:blur(5px);">
+                            <span style="color:white; font-size:14px;">🔄 Try another theme</span>
+                        </div>
+                        <div style="background:rgba(255,255,255,0.2); padding:10px 20px; border-radius:50px; backdrop-filter:blur(5px);">
+                            <span style="color:white; font-size:14px;">👕 Add more clothing</span>
                         </div>
-                        <div style="width:60px; height:5px; background-color:white; margin:20px auto; border-radius:5px; opacity:0.7;"></div>
                     </div>
-                    """, unsafe_allow_html=True)
+                    <div style="width:60px; height:5px; background-color:white; margin:20px auto; border-radius:5px; opacity:0.7;"></div>
+                </div>
+                """, unsafe_allow_html=True)
@@ -0,0 +1,234 @@
+import os
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from database import (DB_ERRORS, create_background_job, claim_background_jobs, get_background_job,
+                      release_background_job, requeue_stale_background_jobs, update_background_job)
+from image_store import UPLOAD_FOLDER, PROCESSED_FOLDER
+
+# Number of worker processes. Each one holds its own copy of the model, and
+# ONNX Runtime already runs one inference on several cores, so a couple of
+# workers sharing the cores beats one single-threaded worker per core.
+WORKER_PROCESSES = int(os.environ.get("FASHIONAIST_BG_WORKERS", "0")) or min(2, os.cpu_count() or 1)
+
+# Seconds between polls of the job table when no job finished or was queued
+POLL_INTERVAL = 2.0
+
+# Jobs left running for longer than this were abandoned by a worker that died
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+# A job whose worker died this many times is failed instead of requeued
+MAX_JOB_ATTEMPTS = 3
+
+def _init_worker(threads):
+    """Give each worker process its share of the cores for model inference"""
+    import image_processor
+    # An explicit FASHIONAIST_REMBG_THREADS setting wins
+    if image_processor.REMBG_THREADS <= 0:
+        image_processor.REMBG_THREADS = threads
+
+def _run_background_removal(filename):
+    """
+    Remove the background of an uploaded image (runs in a worker process)
+
+    Each worker process loads the rembg model once and keeps it for every
+    job it runs.
+    """
+    from image_processor import remove_background
+    from thumbnails import generate_thumbnails
+    from feature_store import compute_features, save_features
+
+    upload_path = os.path.join(UPLOAD_FOLDER, filename)
+    processed_path = os.path.join(PROCESSED_FOLDER, filename)
+
+    # Let failures propagate so the job is recorded as failed
+    img = remove_background(upload_path, raise_errors=True)
+
+    # Write to a temporary file first so readers never see a partial image
+    temp_path = f"{processed_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    img.save(temp_path, "PNG")
+    os.replace(temp_path, processed_path)
+
+    generate_thumbnails(processed_path)
+
+    # Stored images are named after their content hash; the features of the
+    # cut-out item replace any extracted from the original upload
+    image_hash = os.path.splitext(filename)[0]
+    save_features(image_hash, compute_features(img))
+
+class BackgroundRemovalWorker:
+    """
+    Dispatches queued background removal jobs to a process pool
+
+    A daemon thread claims pending jobs from the background_jobs table while
+    the pool has free workers and records the outcome of each job, so the
+    Streamlit script thread never runs the model itself.
+    """
+
+    def __init__(self, max_workers=WORKER_PROCESSES, poll_interval=POLL_INTERVAL):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._executor = None
+        self._thread = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._pool_broken = False
+
+    def _create_executor(self):
+        # Spawn rather than fork: the app process holds threads and database connections
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(max(1, (os.cpu_count() or 1) // self.max_workers),)
+        )
+
+    def _restart_executor(self):
+        """Replace a pool that lost a worker process; its in-flight jobs fail with BrokenProcessPool"""
+        print("Background removal worker pool broke, starting a new one")
+        self._pool_broken = False
+        old_executor, self._executor = self._executor, self._create_executor()
+        old_executor.shutdown(wait=False)
+
+    def start(self):
+        """Start the worker processes and the dispatch thread"""
+        if self._thread is not None:
+            return
+        self._executor = self._create_executor()
+        self._thread = threading.Thread(target=self._run, name="background-removal-dispatch", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop dispatching jobs and shut the worker processes down"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def wake(self):
+        """Check the queue now instead of waiting for the next poll"""
+        self._wake.set()
+
+    def _run(self):
+        try:
+            requeued = requeue_stale_background_jobs(datetime.now() - STALE_JOB_TIMEOUT, MAX_JOB_ATTEMPTS)
+            if requeued:
+                print(f"Requeued {requeued} stale background removal jobs")
+        except DB_ERRORS as e:
+            print(f"Error requeuing stale background jobs: {e}")
+
+        while not self._stopping:
+            if self._pool_broken:
+                self._restart_executor()
+
+            with self._lock:
+                free = self.max_workers - len(self._in_flight)
+
+            if free > 0:
+                try:
+                    jobs = claim_background_jobs(free)
+                except DB_ERRORS as e:
+                    print(f"Error claiming background jobs: {e}")
+                    jobs = []
+
+                for index, (job_id, filename) in enumerate(jobs):
+                    try:
+                        future = self._executor.submit(_run_background_removal, filename)
+                    except (BrokenProcessPool, RuntimeError) as e:
+                        # The pool lost a worker or is shutting down: the
+                        # claimed jobs that were not submitted go back to the queue
+                        print(f"Error submitting background removal job {job_id}: {e}")
+                        for unsent_id, _ in jobs[index:]:
+                            self._release(unsent_id, str(e))
+                        self._pool_broken = not self._stopping
+                        break
+                    with self._lock:
+                        self._in_flight[future] = (job_id, self._executor)
+                    future.add_done_callback(self._job_finished)
+
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _job_finished(self, future):
+        with self._lock:
+            job_id, executor = self._in_flight.pop(future)
+
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A worker process died (every job in flight on the pool gets
+            # this error); retry the job on a new pool
+            print(f"Background removal job {job_id} lost its worker: {error}")
+            self._release(job_id, str(error))
+            # Jobs of a pool that was already replaced must not break the new one
+            if executor is self._executor and not self._stopping:
+                self._pool_broken = True
+            self._wake.set()
+            return
+
+        try:
+            if error is None:
+                update_background_job(job_id, 'done')
+            else:
+                print(f"Background removal job {job_id} failed: {error}")
+                update_background_job(job_id, 'failed', str(error))
+        except DB_ERRORS as e:
+            print(f"Error recording result of background job {job_id}: {e}")
+
+        # A worker is free again
+        self._wake.set()
+
+    def _release(self, job_id, error):
+        try:
+            release_background_job(job_id, MAX_JOB_ATTEMPTS, error)
+        except DB_ERRORS as e:
+            print(f"Error requeuing background job {job_id}: {e}")
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def start_background_worker():
+    """Start the process-wide background removal worker if it is not running yet"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                worker = BackgroundRemovalWorker()
+                worker.start()
+                _worker = worker
+    return _worker
+
+def enqueue_background_removal(filename):
+    """
+    Queue background removal for an image saved in the upload folder
+
+    The result is written to the processed folder under the same filename.
+
+    Args:
+        filename (str): Image filename
+
+    Returns:
+        int: Job ID to poll with get_job_status()
+    """
+    job_id = create_background_job(filename)
+    if _worker is not None:
+        _worker.wake()
+    return job_id
+
+def get_job_status(job_id):
+    """
+    Get the status of a background removal job
+
+    Returns:
+        str: 'pending', 'running', 'done', 'failed', or None if the job does not exist
+    """
+    job = get_background_job(job_id)
+    return job[2] if job else None
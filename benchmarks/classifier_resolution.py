@@ -0,0 +1,53 @@
+"""
+Classifier latency vs. input size, at full resolution and on the bounded working copy
+
+Usage: python benchmarks/classifier_resolution.py [repeats]
+"""
+import io
+import os
+import sys
+import time
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier import MAX_WORKING_SIDE, extract_features, open_image, categorize
+
+# (width, height) of the synthetic photos, up to a 12 megapixel phone photo
+INPUT_SIZES = [(500, 375), (1000, 750), (2000, 1500), (3000, 2250), (4000, 3000)]
+
+def make_photo(size):
+    """A JPEG of a colored garment shape on a black background"""
+    width, height = size
+    img = Image.new("RGB", size, (0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([width * 0.3, height * 0.1, width * 0.7, height * 0.9], fill=(180, 40, 60))
+    draw.ellipse([width * 0.35, height * 0.2, width * 0.65, height * 0.5], fill=(40, 90, 180))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def time_classification(data, max_side, repeats):
+    """Median seconds to decode and classify a JPEG"""
+    timings = []
+    category = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        image = open_image(io.BytesIO(data), max_side)
+        category = categorize(extract_features(image, max_side))[0]
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], category
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'input':>11}  {'full res (ms)':>13}  {f'max {MAX_WORKING_SIDE}px (ms)':>15}  {'speedup':>7}  category")
+    for size in INPUT_SIZES:
+        data = make_photo(size)
+        full, full_category = time_classification(data, None, repeats)
+        bounded, bounded_category = time_classification(data, MAX_WORKING_SIDE, repeats)
+        categories = full_category if full_category == bounded_category else f"{full_category} / {bounded_category}"
+        print(f"{size[0]:>5}x{size[1]:<5}  {full * 1000:>13.1f}  {bounded * 1000:>15.1f}  {full / bounded:>6.1f}x  {categories}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Import-time profile of the app's startup and per-page modules
+
+Runs each import set in a fresh interpreter with `python -X importtime`
+and reports the total time plus the slowest top-level packages.
+
+Usage: python benchmarks/import_time.py [top N]
+"""
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported at the top of app.py (what the Home page pays for)
+STARTUP = ["streamlit", "PIL.Image", "database", "search_index", "migrations", "thumbnails", "background_jobs",
+           "image_store", "utils"]
+
+# The extra modules each page imports on first use. Each set is timed on top
+# of the startup modules only, as if it were the first page visited.
+IMPORT_SETS = [
+    ("Upload page", ["feature_store"]),
+    ("Recommendations page", ["outfit_recommender", "composite_cache"]),
+    ("first background removal", ["image_processor", "rembg"])
+]
+
+def profile(modules, preload=()):
+    """
+    Import modules in a fresh interpreter with -X importtime
+
+    Args:
+        modules (list): Modules to time
+        preload (list): Modules imported first and left out of the timing
+
+    Returns:
+        tuple: (total microseconds, {top-level package: cumulative microseconds}, error or None)
+    """
+    code = "".join(f"import {module}\n" for module in preload)
+    code += "import sys\nsys.stderr.write('--- start\\n')\n"
+    code += "".join(f"import {module}\n" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return 0, {}, result.stderr.strip().splitlines()[-1]
+
+    packages = {}
+    started = False
+    for line in result.stderr.splitlines():
+        if line == "--- start":
+            started = True
+            continue
+        if not started or not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Top-level imports are the lines without extra indentation
+        if len(name) - len(name.lstrip()) == 1:
+            packages[name.strip()] = int(cumulative)
+    return sum(packages.values()), packages, None
+
+def importable(module, preload=()):
+    """Whether a module imports in this environment (optional dependencies may be missing)"""
+    code = "".join(f"import {name}\n" for name in list(preload) + [module])
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True).returncode == 0
+
+def report(label, modules, preload, top):
+    """Profile one import set and print its total and slowest packages"""
+    missing = [module for module in modules if not importable(module, preload)]
+    modules = [module for module in modules if module not in missing]
+    total, packages, error = profile(modules, preload)
+    if error:
+        print(f"{label}: failed ({error})\n")
+        return modules
+    print(f"{label}: {total / 1000:.1f} ms" + (f" (not installed: {', '.join(missing)})" if missing else ""))
+    for name, cumulative in sorted(packages.items(), key=lambda entry: -entry[1])[:top]:
+        print(f"    {cumulative / 1000:>8.1f} ms  {name}")
+    print()
+    return modules
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    startup = report("startup (Home page)", STARTUP, [], top)
+    for label, modules in IMPORT_SETS:
+        report(label, modules, startup, top)
+
+if __name__ == "__main__":
+    main()
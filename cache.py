@@ -0,0 +1,224 @@
+import time
+import threading
+import functools
+from db_pool import db_connection, execute, get_pool
+
+# Seconds cached reference data is served before its version is checked again
+DEFAULT_TTL = 60.0
+
+# Seconds between version checks of the process-wide in-memory indexes
+VERSION_CHECK_INTERVAL = 5.0
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+_watches = {}                    # namespace -> VersionWatch objects
+_watches_lock = threading.Lock()
+
+def get_version(namespace):
+    """
+    Get the stored version counter of a cache namespace
+
+    Returns:
+        int: Version number (0 if the namespace was never invalidated)
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, 'SELECT version FROM cache_versions WHERE name = %s', (namespace,))
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+def bump_version(cursor, namespace):
+    """
+    Increment the version counter of a cache namespace inside an open transaction
+
+    Use this next to the statements that change the cached data, so other
+    processes notice the change once their TTL runs out.
+
+    Returns:
+        int: The new version number
+    """
+    execute(cursor,
+        '''INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+        ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1''',
+        (namespace,)
+    )
+    execute(cursor, 'SELECT version FROM cache_versions WHERE name = %s', (namespace,))
+    return cursor.fetchone()[0]
+
+class TTLCache:
+    """
+    Read-through cache of reference data that rarely changes
+
+    Values are served from memory for ttl seconds. After that the
+    namespace's version counter in the cache_versions table is checked:
+    if no process bumped it, the cached values are kept for another ttl,
+    otherwise they are dropped and reloaded on demand.
+    """
+
+    def __init__(self, namespace, ttl=DEFAULT_TTL):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def _check_version(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.ttl:
+            return
+        try:
+            version = get_version(self.namespace)
+        except get_pool().backend.errors as e:
+            # Keep serving what we have until the database is reachable again
+            print(f"Error checking cache version of {self.namespace}: {e}")
+            if self._version is None:
+                raise
+            return
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        self._checked_at = now
+
+    def get(self, key, loader):
+        """
+        Get a cached value, calling loader() to produce it on a miss
+
+        Args:
+            key: Hashable key of the value
+            loader (callable): Loads the value from the database
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        with self._lock:
+            self._check_version()
+            if key not in self._entries:
+                self._entries[key] = loader()
+            return self._entries[key]
+
+    def clear(self):
+        """Drop the values cached in this process"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+def get_cache(namespace, ttl=DEFAULT_TTL):
+    """Get the process-wide cache of a namespace, creating it on first use"""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = TTLCache(namespace, ttl)
+        return _caches[namespace]
+
+def cached(namespace, ttl=DEFAULT_TTL):
+    """
+    Decorator caching a lookup function's results by its arguments
+
+    Results are shared by every caller in the process, so they must not
+    be mutated.
+
+    Args:
+        namespace (str): Name of the version counter guarding the data
+        ttl (float): Seconds between version checks
+    """
+    def decorator(function):
+        cache = get_cache(namespace, ttl)
+
+        @functools.wraps(function)
+        def wrapper(*args):
+            return cache.get((function.__name__,) + args, lambda: function(*args))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def invalidate(namespace):
+    """
+    Invalidate a namespace in every process
+
+    Bumps the stored version counter and drops the values cached in this
+    process straight away; other processes reload after their TTL.
+    """
+    with db_connection() as conn:
+        bump_version(conn.cursor(), namespace)
+    get_cache(namespace).clear()
+
+class VersionWatch:
+    """
+    Notices when another process changes the data behind an in-memory index
+
+    Process-wide indexes are kept current by listeners for the changes made
+    in their own process, which report their version bumps through
+    record_local_change(). A version bumped by any other process (another
+    Streamlit server or the import command) makes changed() return True,
+    at most ttl seconds later, so the owner can reload.
+    """
+
+    def __init__(self, namespace, ttl=VERSION_CHECK_INTERVAL):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        with _watches_lock:
+            _watches.setdefault(namespace, []).append(self)
+
+    def _read_version(self):
+        try:
+            return get_version(self.namespace)
+        except get_pool().backend.errors as e:
+            print(f"Error checking version of {self.namespace}: {e}")
+            return None
+
+    def sync(self):
+        """Record the current version; call right before (re)loading the index"""
+        version = self._read_version()
+        with self._lock:
+            self.version = version
+            self._checked_at = time.monotonic()
+
+    def changed(self):
+        """
+        Whether another process changed the data since the last check
+
+        Returns True once per change, after recording the new version, so the
+        caller should reload straight away.
+
+        Returns:
+            bool: True if the index should be reloaded
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.ttl:
+                return False
+            self._checked_at = now
+
+        version = self._read_version()
+        with self._lock:
+            if version is None or version == self.version:
+                return False
+            self.version = version
+            return True
+
+    def _local_change(self, version):
+        with self._lock:
+            # Only skip the reload if no other process bumped the version in between
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+def record_local_change(namespace, version):
+    """
+    Tell the watches of a namespace about a version bump made in this process
+
+    Call after the transaction has committed and the in-process listeners
+    have run, so the bump does not trigger a needless reload.
+
+    Args:
+        namespace (str): Name of the version counter
+        version (int): Version returned by bump_version
+    """
+    with _watches_lock:
+        watches = list(_watches.get(namespace, []))
+    for watch in watches:
+        watch._local_change(version)
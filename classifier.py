@@ -1,95 +1,279 @@
 import numpy as np
 from PIL import Image
-import cv2
 import os
 
 # In a real implementation, this would use a trained TensorFlow/Keras model
 # For now, we'll implement a simplified classifier using color and shape analysis
 
-def classify_clothing(image):
+# Layout of the shape and color feature vectors. Shape features are ratios,
+# so they do not depend on the resolution the image was analysed at.
+FEATURE_NAMES = [
+    "aspect_ratio",          # Bounding box width / height
+    "extent",                # Contour area / bounding box area
+    "area_ratio",            # Contour area / image area
+    "box_height_ratio",      # Bounding box height / image height
+    "box_width_ratio",       # Bounding box width / image width
+    "box_height_to_width",   # Bounding box height / image width
+    "mean_b",                # Mean color inside the item (BGR)
+    "mean_g",
+    "mean_r"
+]
+
+# Side of the square canvas every image is scaled onto for batch classification
+BATCH_WORKING_SIZE = 256
+
+# Longest side of the working copy single images are analysed at. The
+# features are ratios, so they come out the same as at full resolution.
+MAX_WORKING_SIDE = 512
+
+def categorize(features):
     """
-    Classify clothing item based on simple image analysis
-    
+    Apply the classification rules to a stack of feature vectors
+
     Args:
-        image (PIL.Image): The clothing image to classify
-        
+        features (numpy.ndarray): Array of shape (N, len(FEATURE_NAMES)); rows of zeros mean no item was found
+
     Returns:
-        str: The predicted category (Top, Bottom, Dress, Footwear, Accessory, Ethnic wear)
+        list: Predicted category for each row
+    """
+    features = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+    aspect_ratio = features[:, 0]
+    extent = features[:, 1]
+    area_ratio = features[:, 2]
+    box_height_ratio = features[:, 3]
+    box_width_ratio = features[:, 4]
+    box_height_to_width = features[:, 5]
+    color_spread = np.std(features[:, 6:9], axis=1)
+
+    # Simple rules for classification based on shape and aspect ratio
+    # These thresholds are simplified and would be learned in a real model
+    # (the conditions are checked in order, like an if/elif chain)
+    conditions = [
+        # If no item was found, return default category
+        (box_height_ratio <= 0) & (box_width_ratio <= 0),
+        # Very elongated items are classified as dresses
+        aspect_ratio < 0.5,
+        # Wider items with moderate height are likely bottoms
+        (aspect_ratio >= 0.5) & (aspect_ratio <= 1.5) & (box_height_to_width < 1),
+        # Very short items could be footwear
+        (box_height_ratio < 0.3) & (box_width_ratio < 0.7),
+        # Small items with high extent (filled area) may be accessories
+        (area_ratio < 0.3) & (extent > 0.7),
+        # Items with lots of color and moderate aspect ratio might be ethnic wear
+        (color_spread > 40) & (aspect_ratio >= 0.5) & (aspect_ratio <= 1.5)
+    ]
+    choices = ["Top", "Dress", "Bottom", "Footwear", "Accessory", "Ethnic wear"]
+
+    # Default to top if unsure
+    return np.select(conditions, choices, default="Top").tolist()
+
+def _working_size(size, max_side):
+    scale = max_side / max(size)
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+def working_copy(image, max_side=MAX_WORKING_SIDE):
+    """
+    Get a copy of an image whose longest side is at most max_side pixels
+
+    Args:
+        image (PIL.Image): The clothing image
+        max_side (int): Longest side of the copy, or None to keep the full resolution
+
+    Returns:
+        PIL.Image: The downscaled copy, or the image itself if it is small enough
+    """
+    if max_side is None or max(image.size) <= max_side:
+        return image
+    # Nearest neighbour keeps the foreground edge as sharp as the original mask
+    return image.resize(_working_size(image.size, max_side), Image.NEAREST)
+
+def open_image(path, max_side=MAX_WORKING_SIDE):
+    """
+    Open an image file for classification at a bounded resolution
+
+    JPEG files are decoded directly at a reduced scale, so a large phone
+    photo is never decoded at full size.
+
+    Args:
+        path (str): Path to the image file
+        max_side (int): Longest side of the returned image, or None for the full resolution
+
+    Returns:
+        PIL.Image: The loaded image
+    """
+    with Image.open(path) as img:
+        if max_side is not None and max(img.size) > max_side:
+            img.draft("RGB", _working_size(img.size, max_side))
+        img.load()
+        return working_copy(img, max_side)
+
+def extract_features(image, max_side=MAX_WORKING_SIDE):
     """
+    Extract the shape and color features of a clothing image
+
+    Args:
+        image (PIL.Image): The clothing image
+        max_side (int): Longest side of the working copy the features are computed on,
+            or None to use the full resolution
+
+    Returns:
+        numpy.ndarray: Feature vector laid out as FEATURE_NAMES (all zeros if no item was found)
+    """
+    # OpenCV is slow to import, so load it on first use
+    import cv2
+
+    image = working_copy(image, max_side)
+
     # Convert to numpy array for OpenCV processing
-    img_array = np.array(image)
-    
+    img_array = np.array(image.convert("RGBA") if image.mode not in ("RGB", "RGBA") else image)
+
     # Convert to BGR for OpenCV
     if img_array.shape[2] == 4:  # If RGBA
         img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
     else:
         img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-    
+
     # Get image dimensions
     height, width, _ = img_array.shape
-    
-    # Calculate aspect ratio
-    aspect_ratio = width / height
-    
+
     # Extract shape features
     # Convert to grayscale
     gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
-    
+
     # Threshold to get binary image
     _, thresh = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
-    
+
     # Find contours
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # If no contours found, return default category
+
     if not contours:
-        return "Top"
-    
+        return np.zeros(len(FEATURE_NAMES), dtype=np.float32)
+
     # Get the largest contour
     largest_contour = max(contours, key=cv2.contourArea)
-    
+
     # Calculate bounding rectangle
     x, y, w, h = cv2.boundingRect(largest_contour)
-    
+
     # Calculate shape features
-    extent = cv2.contourArea(largest_contour) / (w * h)
+    area = cv2.contourArea(largest_contour)
+    extent = area / (w * h)
     aspect_ratio = w / h if h > 0 else 0
-    
+
     # Calculate color features
     # Create a mask for the contour
     mask = np.zeros(gray.shape, np.uint8)
     cv2.drawContours(mask, [largest_contour], 0, 255, -1)
-    
+
     # Calculate average color
     mean_color = cv2.mean(img_array, mask=mask)[:3]
-    
-    # Simple rules for classification based on shape and aspect ratio
-    # These thresholds are simplified and would be learned in a real model
-    
-    # Very elongated items are likely tops or dresses
-    if aspect_ratio < 0.5:
-        # If it's very long, likely a dress
-        if h > 2 * w:
-            return "Dress"
-        else:
-            return "Top"
-    
-    # Wider items with moderate height are likely bottoms
-    elif 0.5 <= aspect_ratio <= 1.5 and h < width:
-        return "Bottom"
-    
-    # Very short items could be footwear
-    elif h < 0.3 * height and w < 0.7 * width:
-        return "Footwear"
-    
-    # Small items with high extent (filled area) may be accessories
-    elif cv2.contourArea(largest_contour) < 0.3 * (width * height) and extent > 0.7:
-        return "Accessory"
-    
-    # Items with lots of color and moderate aspect ratio might be ethnic wear
-    elif np.std(mean_color) > 40 and 0.5 <= aspect_ratio <= 1.5:
-        return "Ethnic wear"
-    
-    # Default to top if unsure
-    else:
-        return "Top"
+
+    return np.array([
+        aspect_ratio,
+        extent,
+        area / (width * height),
+        h / height,
+        w / width,
+        h / width,
+        *mean_color
+    ], dtype=np.float32)
+
+def classify_clothing(image):
+    """
+    Classify clothing item based on simple image analysis
+
+    Args:
+        image (PIL.Image): The clothing image to classify
+
+    Returns:
+        str: The predicted category (Top, Bottom, Dress, Footwear, Accessory, Ethnic wear)
+    """
+    return categorize(extract_features(image))[0]
+
+def _to_working_canvas(image, size):
+    """Scale an image to fit a size x size canvas, returning the canvas and the content size"""
+    scale = min(size / image.width, size / image.height)
+    content_width = max(1, round(image.width * scale))
+    content_height = max(1, round(image.height * scale))
+    # Nearest neighbour keeps the foreground edge as sharp as the original mask
+    img = image.resize((content_width, content_height), Image.NEAREST)
+    if img.mode != "RGB":
+        # Drops alpha without compositing, like COLOR_RGBA2BGR in the single image path
+        img = img.convert("RGB")
+
+    canvas = np.zeros((size, size, 3), dtype=np.uint8)
+    canvas[:content_height, :content_width] = np.asarray(img)
+    return canvas, content_width, content_height
+
+def classify_clothing_batch(images, working_size=BATCH_WORKING_SIZE):
+    """
+    Classify many clothing images at once
+
+    Every image is scaled onto a common working canvas and the features are
+    computed for the whole batch with stacked NumPy array operations. The
+    item is taken to be the whole foreground rather than the largest
+    contour, which is equivalent for background-removed photos.
+
+    Args:
+        images (list): PIL images to classify
+        working_size (int): Side of the square working canvas in pixels
+
+    Returns:
+        tuple: (list of predicted categories, feature array of shape (N, len(FEATURE_NAMES)))
+    """
+    if not images:
+        return [], np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32)
+
+    canvases = []
+    content_sizes = []
+    for image in images:
+        canvas, content_width, content_height = _to_working_canvas(image, working_size)
+        canvases.append(canvas)
+        content_sizes.append((content_width, content_height))
+
+    batch = np.stack(canvases)  # (N, S, S, 3) in RGB order
+    width = np.array([size[0] for size in content_sizes], dtype=np.float64)
+    height = np.array([size[1] for size in content_sizes], dtype=np.float64)
+
+    # Foreground mask: grayscale value above 1, as with cv2.threshold(gray, 1, ...)
+    # (same fixed-point weights as cv2.cvtColor)
+    channels = batch.astype(np.uint32)
+    gray = (channels[..., 0] * 4899 + channels[..., 1] * 9617 + channels[..., 2] * 1868 + 8192) >> 14
+    mask = gray > 1
+
+    # Bounding boxes from the first and last foreground row and column
+    rows = mask.any(axis=2)
+    cols = mask.any(axis=1)
+    found = rows.any(axis=1)
+    top = rows.argmax(axis=1)
+    bottom = working_size - rows[:, ::-1].argmax(axis=1)
+    left = cols.argmax(axis=1)
+    right = working_size - cols[:, ::-1].argmax(axis=1)
+    h = np.where(found, bottom - top, 0).astype(np.float64)
+    w = np.where(found, right - left, 0).astype(np.float64)
+
+    area = mask.sum(axis=(1, 2)).astype(np.float64)
+    safe_h = np.maximum(h, 1)
+    safe_w = np.maximum(w, 1)
+
+    # Mean color inside the mask, in BGR order like cv2.mean on the BGR image
+    count = len(batch)
+    color_sums = np.matmul(
+        mask.reshape(count, 1, -1).astype(np.float32),
+        batch.reshape(count, -1, 3).astype(np.float32)
+    ).reshape(count, 3).astype(np.float64)
+    mean_rgb = color_sums / np.maximum(area, 1)[:, None]
+
+    features = np.column_stack([
+        w / safe_h,
+        area / (safe_w * safe_h),
+        area / (width * height),
+        h / height,
+        w / width,
+        h / width,
+        mean_rgb[:, ::-1]
+    ])
+    features[~found] = 0
+    features = features.astype(np.float32)
+
+    return categorize(features), features
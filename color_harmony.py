@@ -0,0 +1,238 @@
+import threading
+import numpy as np
+from cache import VersionWatch
+from database import get_clothing_items, parse_color_info, register_item_delete_listener, register_item_listener
+
+# Colors with less chroma than this (in Lab units) are neutrals: black, white, grey, beige
+NEUTRAL_CHROMA = 12.0
+
+# Hue difference (degrees) up to which colors count as analogous, and the
+# tolerance around 180 degrees for complementary colors
+ANALOGOUS_ANGLE = 30.0
+COMPLEMENTARY_TOLERANCE = 30.0
+
+# Scores of the harmony rules (1.0 is a perfect match)
+ANALOGOUS_SCORE = 1.0
+COMPLEMENTARY_SCORE = 0.9
+NEUTRAL_SCORE = 0.8
+CLASH_SCORE = 0.2
+
+# Score used for items without a stored color
+UNKNOWN_SCORE = 0.5
+
+def hex_to_lab(hex_colors):
+    """
+    Convert hex colors like '#1e6b8c' to CIE Lab (D65)
+
+    Args:
+        hex_colors (list): Hex color strings
+
+    Returns:
+        numpy.ndarray: Array of shape (N, 3) with L, a and b
+    """
+    rgb = np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in hex_colors],
+                   dtype=np.float64).reshape(-1, 3) / 255.0
+
+    # sRGB to linear RGB to XYZ
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ np.array([
+        [0.4124, 0.2126, 0.0193],
+        [0.3576, 0.7152, 0.1192],
+        [0.1805, 0.0722, 0.9505]
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.column_stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])])
+
+def _valid_hex(color):
+    if not isinstance(color, str) or len(color) != 7 or not color.startswith('#'):
+        return False
+    try:
+        int(color[1:], 16)
+    except ValueError:
+        return False
+    return True
+
+def harmony(lab_a, lab_b):
+    """
+    Score how well colors go together, from CLASH_SCORE to ANALOGOUS_SCORE
+
+    Neutrals go with everything; other colors match when their hues are
+    analogous (close) or complementary (opposite), with the score fading
+    linearly to CLASH_SCORE outside those windows. Arrays broadcast
+    against each other.
+
+    Args:
+        lab_a (numpy.ndarray): Lab colors, shape (..., 3)
+        lab_b (numpy.ndarray): Lab colors, shape (..., 3)
+
+    Returns:
+        numpy.ndarray: Harmony scores
+    """
+    lab_a = np.asarray(lab_a, dtype=np.float64)
+    lab_b = np.asarray(lab_b, dtype=np.float64)
+    chroma_a = np.hypot(lab_a[..., 1], lab_a[..., 2])
+    chroma_b = np.hypot(lab_b[..., 1], lab_b[..., 2])
+    hue_a = np.degrees(np.arctan2(lab_a[..., 2], lab_a[..., 1]))
+    hue_b = np.degrees(np.arctan2(lab_b[..., 2], lab_b[..., 1]))
+
+    difference = np.abs(hue_a - hue_b) % 360
+    difference = np.minimum(difference, 360 - difference)
+
+    # 1 inside each window, falling to 0 one window width further out
+    analogous = np.clip(2 - difference / ANALOGOUS_ANGLE, 0, 1)
+    complementary = np.clip(2 - np.abs(180 - difference) / COMPLEMENTARY_TOLERANCE, 0, 1)
+    score = np.maximum(CLASH_SCORE + (ANALOGOUS_SCORE - CLASH_SCORE) * analogous,
+                       CLASH_SCORE + (COMPLEMENTARY_SCORE - CLASH_SCORE) * complementary)
+
+    neutral = (chroma_a < NEUTRAL_CHROMA) | (chroma_b < NEUTRAL_CHROMA)
+    return np.where(neutral, np.maximum(score, NEUTRAL_SCORE), score)
+
+class ColorHarmony:
+    """
+    Cached Lab colors of every wardrobe item for scoring outfits
+
+    Each item's primary color is converted to Lab once and kept in an array
+    that is updated as items are saved and deleted. Harmony is computed only
+    for the item pairs inside the outfits being ranked, so memory grows
+    linearly with the wardrobe rather than with the number of pairs.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset(0)
+
+    def _reset(self, capacity):
+        self.index = {}                                   # item_id -> row
+        self.ids = []                                     # row -> item_id
+        self.lab = np.zeros((capacity, 3))                # Lab color per row
+        self.has_color = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed):
+        capacity = len(self.has_color)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 64)
+        lab, has_color = self.lab, self.has_color
+        self.lab = np.zeros((capacity, 3))
+        self.lab[:len(lab)] = lab
+        self.has_color = np.zeros(capacity, dtype=bool)
+        self.has_color[:len(has_color)] = has_color
+
+    def load(self, items=None):
+        """
+        (Re)load the item colors
+
+        Args:
+            items (list, optional): Clothing item records to use instead of querying the database
+        """
+        if items is None:
+            items = get_clothing_items()
+
+        with self._lock:
+            self._reset(len(items))
+            colors = [parse_color_info(item[3])["primary"] for item in items]
+            known = np.array([_valid_hex(color) for color in colors], dtype=bool)
+            self.ids = [item[0] for item in items]
+            self.index = {item_id: row for row, item_id in enumerate(self.ids)}
+            if known.any():
+                self.lab[known] = hex_to_lab([color for color, ok in zip(colors, known) if ok])
+            self.has_color[:len(items)] = known
+
+    def add_item(self, item):
+        """Add or replace a single clothing item record"""
+        with self._lock:
+            row = self.index.get(item[0])
+            if row is None:
+                row = len(self.ids)
+                self._grow(row + 1)
+                self.index[item[0]] = row
+                self.ids.append(item[0])
+
+            color = parse_color_info(item[3])["primary"]
+            self.has_color[row] = _valid_hex(color)
+            self.lab[row] = hex_to_lab([color])[0] if self.has_color[row] else 0
+
+    def remove_item(self, item_id):
+        """Remove a clothing item, moving the last row into its place"""
+        with self._lock:
+            row = self.index.pop(item_id, None)
+            if row is None:
+                return
+            last = len(self.ids) - 1
+            if row != last:
+                moved_id = self.ids[last]
+                self.ids[row] = moved_id
+                self.index[moved_id] = row
+                self.lab[row] = self.lab[last]
+                self.has_color[row] = self.has_color[last]
+            self.ids.pop()
+            self.lab[last] = 0
+            self.has_color[last] = False
+
+    def score_outfits(self, outfits):
+        """
+        Mean pairwise color harmony of each outfit
+
+        Args:
+            outfits (list): Outfits as lists of item IDs (of any length)
+
+        Returns:
+            numpy.ndarray: One score per outfit (UNKNOWN_SCORE for outfits with fewer than two known items)
+        """
+        if not outfits:
+            return np.zeros(0)
+
+        with self._lock:
+            width = max(len(outfit) for outfit in outfits)
+            rows = np.zeros((len(outfits), width), dtype=np.intp)
+            present = np.zeros((len(outfits), width), dtype=bool)
+            for i, outfit in enumerate(outfits):
+                for j, item_id in enumerate(outfit):
+                    row = self.index.get(item_id)
+                    if row is not None:
+                        rows[i, j] = row
+                        present[i, j] = True
+            lab = self.lab[rows]
+            known = self.has_color[rows] & present
+
+        # Only the pairs inside each outfit are scored: (outfits, width, width)
+        scores = harmony(lab[:, :, None, :], lab[:, None, :, :])
+        scores = np.where(known[:, :, None] & known[:, None, :], scores, UNKNOWN_SCORE)
+
+        # Count each distinct pair of items present in the outfit once
+        pairs = present[:, :, None] & present[:, None, :] & np.triu(np.ones((width, width), dtype=bool), 1)
+        pair_counts = pairs.sum(axis=(1, 2))
+        totals = np.where(pairs, scores, 0).sum(axis=(1, 2))
+        return np.where(pair_counts > 0, totals / np.maximum(pair_counts, 1), UNKNOWN_SCORE)
+
+    def rank_outfits(self, outfits):
+        """Sort outfits by color harmony, best first (stable for equal scores)"""
+        scores = self.score_outfits(outfits)
+        return [outfits[i] for i in np.argsort(-scores, kind="stable")]
+
+_harmony = None
+_harmony_watch = None
+_harmony_lock = threading.Lock()
+
+def get_color_harmony():
+    """
+    Get the process-wide color harmony cache, building it on first use
+
+    Reloaded when another process changes the clothing items (see cache.VersionWatch).
+    """
+    global _harmony, _harmony_watch
+    if _harmony is None:
+        with _harmony_lock:
+            if _harmony is None:
+                harmony_cache = ColorHarmony()
+                _harmony_watch = VersionWatch("clothing_items")
+                _harmony_watch.sync()
+                harmony_cache.load()
+                register_item_listener(harmony_cache.add_item)
+                register_item_delete_listener(harmony_cache.remove_item)
+                _harmony = harmony_cache
+    elif _harmony_watch.changed():
+        _harmony.load()
+    return _harmony
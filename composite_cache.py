@@ -0,0 +1,196 @@
+import io
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from image_store import stored_image_path
+from image_processor import LAYOUT_VERSION, combine_outfit_images
+
+# Composite images are written to this folder as PNG files
+COMPOSITE_FOLDER = "composites"
+
+# Encoded composites kept in memory
+MEMORY_CACHE_SIZE = 64
+
+# Composite files kept on disk; the least recently used ones beyond this are
+# deleted, down to DISK_PRUNE_TARGET of the limit so pruning is infrequent
+DISK_CACHE_SIZE = 2000
+DISK_PRUNE_TARGET = 0.9
+
+def composite_key(items, canvas_width, canvas_height):
+    """
+    Cache key of an outfit composite
+
+    Uses the layout version, the canvas size, and the sorted item IDs with
+    their categories and the modification times of their images, so a
+    composite is rebuilt when the layout code changes, an item is
+    recategorized, or its background removal finishes or image changes.
+
+    Args:
+        items (list): Clothing item records in the outfit
+        canvas_width (int): Width of the canvas
+        canvas_height (int): Height of the canvas
+
+    Returns:
+        str: Hex digest identifying the composite
+    """
+    parts = [f"layout{LAYOUT_VERSION}", f"{canvas_width}x{canvas_height}"]
+    for item in sorted(items, key=lambda item: item[0]):
+        path = stored_image_path(item[5])
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        parts.append(f"{item[0]}:{item[2]}:{path}:{mtime}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+class CompositeCache:
+    """
+    Two-tier cache of combined outfit images
+
+    Composites are kept PNG-encoded in an in-memory LRU and in a folder on
+    disk, so a repeated view of the same outfit (e.g. on every Streamlit
+    rerun) is served as bytes without decoding or resizing any image.
+    """
+
+    def __init__(self, max_entries=MEMORY_CACHE_SIZE, folder=COMPOSITE_FOLDER, max_files=DISK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.folder = folder
+        self.max_files = max_files
+        self._entries = OrderedDict()
+        self._file_count = None      # Files on disk, counted on the first write
+        self._lock = threading.Lock()
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _composite_files(self):
+        try:
+            return [entry for entry in os.scandir(self.folder) if entry.name.endswith(".png")]
+        except OSError:
+            return []
+
+    def prune(self, keep=None):
+        """
+        Delete the least recently used composite files beyond keep
+
+        Files are ordered by modification time, which is refreshed on every
+        disk hit. Composites of changed items are never requested again, so
+        they age out here.
+
+        Args:
+            keep (int, optional): Number of files to keep (default: max_files)
+
+        Returns:
+            int: Number of files deleted
+        """
+        keep = self.max_files if keep is None else keep
+        files = self._composite_files()
+        deleted = 0
+        if len(files) > keep:
+            files.sort(key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in files[:len(files) - keep]:
+                try:
+                    os.remove(entry.path)
+                    deleted += 1
+                except OSError as e:
+                    print(f"Error deleting outfit composite {entry.path}: {str(e)}")
+        with self._lock:
+            self._file_count = len(files) - deleted
+        return deleted
+
+    def _count_new_file(self):
+        with self._lock:
+            if self._file_count is None:
+                # First write in this process: count the files already on disk
+                keep = self.max_files
+            else:
+                self._file_count += 1
+                if self._file_count <= self.max_files:
+                    return
+                keep = int(self.max_files * DISK_PRUNE_TARGET)
+        self.prune(keep)
+
+    def get(self, items, canvas_width=600, canvas_height=800):
+        """
+        Get the combined image of an outfit, building it on a cache miss
+
+        Args:
+            items (list): Clothing item records in the outfit
+            canvas_width (int): Width of the canvas
+            canvas_height (int): Height of the canvas
+
+        Returns:
+            bytes: PNG-encoded composite
+        """
+        key = composite_key(items, canvas_width, canvas_height)
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        path = os.path.join(self.folder, f"{key}.png")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Mark the file as recently used for pruning
+            os.utime(path)
+        except OSError:
+            data = None
+
+        if data is None:
+            # Lay the items out in key order so every ordering of the outfit looks the same
+            buffer = io.BytesIO()
+            combine_outfit_images(sorted(items, key=lambda item: item[0]), canvas_width, canvas_height).save(buffer, "PNG")
+            data = buffer.getvalue()
+
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                # Write to a temporary file first so readers never see a partial image
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+                self._count_new_file()
+            except OSError as e:
+                print(f"Error writing outfit composite {path}: {str(e)}")
+
+        self._remember(key, data)
+        return data
+
+    def clear(self):
+        """Drop the in-memory tier (the files on disk are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_composite_cache():
+    """Get the process-wide outfit composite cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompositeCache()
+    return _cache
+
+def get_outfit_composite(items, canvas_width=600, canvas_height=800):
+    """
+    Get the PNG-encoded combined image of an outfit from the process-wide cache
+
+    Args:
+        items (list): Clothing item records in the outfit
+        canvas_width (int): Width of the canvas
+        canvas_height (int): Height of the canvas
+
+    Returns:
+        bytes: PNG-encoded composite
+    """
+    return get_composite_cache().get(items, canvas_width, canvas_height)
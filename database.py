@@ -1,190 +1,799 @@
 import os
 import json
+import colorsys
+import sqlite3
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from datetime import datetime
 
+from db_pool import db_connection, execute, executemany, get_pool
+from cache import bump_version, cached, get_cache, record_local_change
+
+# Errors raised by any of the supported database backends
+DB_ERRORS = (psycopg2.Error, sqlite3.Error)
+
+# Columns returned for clothing item records, in record order
+ITEM_COLUMNS = 'id, name, category, color, occasion, filename, date_added'
+
+# Items saved without a section are filed under this one
+DEFAULT_SECTION = "Everyday Wear"
+
+# Sort orders supported by query_clothing_items: (sort key expression, direction)
+ITEM_SORTS = {
+    "newest": ('added_at', 'DESC'),
+    "oldest": ('added_at', 'ASC'),
+    "name_asc": ('LOWER(name)', 'ASC'),
+    "name_desc": ('LOWER(name)', 'DESC')
+}
+
+# Perceptual hashes are indexed in this many bands of two hex digits each
+PHASH_BANDS = 8
+
+# Kinds of counts kept in the wardrobe_stats table ("total" has the single value "all")
+STAT_KINDS = ("total", "category", "section", "season", "color_family")
+
+# Colors with less saturation than this, or darker than COLOR_DARK_VALUE, are
+# filed under the black/grey/white families
+COLOR_NEUTRAL_SATURATION = 0.15
+COLOR_DARK_VALUE = 0.2
+
+# Color families by upper hue bound in degrees, checked in order
+COLOR_FAMILY_HUES = [
+    (15, "Red"),
+    (45, "Orange"),
+    (70, "Yellow"),
+    (165, "Green"),
+    (255, "Blue"),
+    (320, "Purple"),
+    (345, "Pink"),
+    (360, "Red")
+]
+
+# Callbacks notified with the new record after a clothing item is saved
+_item_listeners = []
+
+# Callbacks notified with the ID of a deleted clothing item
+_item_delete_listeners = []
+
+# Callbacks notified after outfit feedback is saved
+_feedback_listeners = []
+
 def get_db_connection():
-    """Get a connection to the PostgreSQL database"""
+    """Get a standalone (unpooled) connection to the configured database"""
     try:
-        # Replace these with your pgAdmin database credentials
-        conn = psycopg2.connect(
-            dbname="fashionaist",
-            user="postgres",  # Replace with your username if different
-            password="fashionAIst@123",  # Replace with your actual password
-            host="localhost", 
-            port="5432"
-        )
-        return conn
+        return get_pool().backend.connect()
     except Exception as e:
         print(f"Database connection error: {str(e)}")
         return None
 
-def init_db():
-    """Initialize the database with required tables if they don't exist"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Create clothing_items table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS clothing_items (
-        id SERIAL PRIMARY KEY,
-        name TEXT NOT NULL,
-        category TEXT NOT NULL,
-        color TEXT,
-        occasion TEXT,
-        filename TEXT NOT NULL,
-        date_added TEXT NOT NULL
-    )
-    ''')
-    
-    # Create themes table for outfit recommendations
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS themes (
-        id SERIAL PRIMARY KEY,
-        name TEXT NOT NULL,
-        description TEXT,
-        categories TEXT NOT NULL
-    )
-    ''')
+def _insert_many(cursor, table, columns, rows, returning_ids=False, ignore_conflicts=False):
+    """
+    Insert many rows with as few statements as the backend allows
     
-    # Create feedback table to track user satisfaction with outfits
-    try:
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS outfit_feedback (
-            id SERIAL PRIMARY KEY,
-            outfit_items TEXT NOT NULL,
-            theme TEXT NOT NULL,
-            rating INTEGER NOT NULL,
-            feedback_text TEXT,
-            date_added TEXT NOT NULL
+    PostgreSQL gets multi-row INSERT statements through execute_values and
+    SQLite a single executemany.
+    
+    Args:
+        cursor: Cursor of the open transaction
+        table (str): Table name
+        columns (list): Column names, in the order of each row's values
+        rows (list): Row value tuples
+        returning_ids (bool): Return the IDs of the new rows
+        ignore_conflicts (bool): Skip rows that violate a unique constraint
+        
+    Returns:
+        list: IDs of the new rows in the order of rows (if returning_ids), else None
+    """
+    if not rows:
+        return [] if returning_ids else None
+    
+    column_list = ', '.join(columns)
+    conflict = ' ON CONFLICT DO NOTHING' if ignore_conflicts else ''
+    if get_pool().backend.name == "postgres":
+        returning = ' RETURNING id' if returning_ids else ''
+        result = execute_values(cursor,
+            f'INSERT INTO {table} ({column_list}) VALUES %s{conflict}{returning}',
+            rows, page_size=1000, fetch=returning_ids
         )
-        ''')
-    except psycopg2.errors.UniqueViolation:
-        # If the table already exists, roll back and continue
-        conn.rollback()
-    
-    # Insert default themes if they don't exist
-    themes = [
-        ('Casual', 'Everyday comfortable outfits', json.dumps(['Top', 'Bottom', 'Casual wear', 'Footwear'])),
-        ('Formal', 'Professional and elegant outfits', json.dumps(['Formal wear', 'Top', 'Bottom', 'Footwear'])),
-        ('Party', 'Stylish and trendy outfits for parties', json.dumps(['Dress', 'Top', 'Bottom', 'Accessory'])),
-        ('Traditional', 'Cultural and traditional outfits', json.dumps(['Ethnic wear', 'Accessory', 'Footwear'])),
-        ('Summer', 'Light and breezy outfits for hot weather', json.dumps(['Top', 'Bottom', 'Casual wear', 'Footwear'])),
-        ('Winter', 'Warm and cozy outfits for cold weather', json.dumps(['Top', 'Bottom', 'Casual wear', 'Footwear']))
-    ]
+        return [row[0] for row in result] if returning_ids else None
+    
+    placeholders = ', '.join(['%s'] * len(columns))
+    executemany(cursor, f'INSERT INTO {table} ({column_list}) VALUES ({placeholders}){conflict}', rows)
+    if not returning_ids:
+        return None
+    # The transaction holds SQLite's write lock, so the new IDs are consecutive
+    execute(cursor, 'SELECT last_insert_rowid()')
+    last_id = cursor.fetchone()[0]
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+def register_item_listener(callback):
+    """
+    Register a callback to be notified when a clothing item is saved
+    
+    Args:
+        callback (callable): Called with the saved clothing item record
+    """
+    if callback not in _item_listeners:
+        _item_listeners.append(callback)
+
+def _notify_item_saved(item):
+    for callback in list(_item_listeners):
+        try:
+            callback(item)
+        except Exception as e:
+            print(f"Error in clothing item listener: {str(e)}")
+
+def register_item_delete_listener(callback):
+    """
+    Register a callback to be notified when a clothing item is deleted
+    
+    Args:
+        callback (callable): Called with the deleted item's ID
+    """
+    if callback not in _item_delete_listeners:
+        _item_delete_listeners.append(callback)
+
+def _notify_item_deleted(item_id):
+    for callback in list(_item_delete_listeners):
+        try:
+            callback(item_id)
+        except Exception as e:
+            print(f"Error in clothing item delete listener: {str(e)}")
+
+def register_feedback_listener(callback):
+    """
+    Register a callback to be notified when outfit feedback is saved
+    
+    Args:
+        callback (callable): Called with the outfit's item IDs (list), theme and rating
+    """
+    if callback not in _feedback_listeners:
+        _feedback_listeners.append(callback)
+
+def _notify_feedback_saved(outfit_items, theme, rating):
+    for callback in list(_feedback_listeners):
+        try:
+            callback(parse_outfit_items(outfit_items), theme, rating)
+        except Exception as e:
+            print(f"Error in outfit feedback listener: {str(e)}")
+
+def parse_outfit_items(outfit_items):
+    """Get the list of item IDs stored in the outfit_items JSON column"""
+    if isinstance(outfit_items, str):
+        try:
+            outfit_items = json.loads(outfit_items)
+        except json.JSONDecodeError:
+            return []
+    if not isinstance(outfit_items, list):
+        return []
+    return [int(item_id) for item_id in outfit_items if str(item_id).isdigit()]
+
+def parse_color_info(color):
+    """
+    Split the color JSON stored by the upload page into its fields
+    
+    Args:
+        color (str): Color JSON string (or a plain color description)
+        
+    Returns:
+        dict: name, primary, secondary, section, brand and seasons (missing fields are None or [])
+    """
+    info = {"name": None, "primary": None, "secondary": None, "section": None, "brand": None, "seasons": []}
+    if not color:
+        return info
     
     try:
-        cursor.execute('SELECT COUNT(*) FROM themes')
-        result = cursor.fetchone()
-        count = result[0] if result else 0
+        color_data = json.loads(color)
+    except (json.JSONDecodeError, TypeError):
+        color_data = None
+    
+    if isinstance(color_data, dict):
+        for key in ("name", "primary", "secondary", "section", "brand"):
+            info[key] = color_data.get(key) or None
+        info["seasons"] = list(color_data.get("seasons") or [])
+    else:
+        # Plain text color description
+        info["name"] = color
+    return info
+
+def color_family(hex_color):
+    """
+    Get the color family of a hex color like '#1e6b8c'
+    
+    Args:
+        hex_color (str): Hex color string
         
-        if count == 0:
-            for theme in themes:
-                cursor.execute(
-                    'INSERT INTO themes (name, description, categories) VALUES (%s, %s, %s)',
-                    theme
-                )
-    except psycopg2.errors.UndefinedTable:
-        # Table doesn't exist yet, so we're creating it for the first time
-        conn.rollback()
-        # Create table again (previous CREATE TABLE might have been rolled back)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS themes (
-            id SERIAL PRIMARY KEY,
-            name TEXT NOT NULL,
-            description TEXT,
-            categories TEXT NOT NULL
+    Returns:
+        str: Family name such as "Blue" or "Grey", or None for a missing or invalid color
+    """
+    if not isinstance(hex_color, str) or len(hex_color) != 7 or not hex_color.startswith('#'):
+        return None
+    try:
+        red, green, blue = (int(hex_color[i:i + 2], 16) / 255.0 for i in (1, 3, 5))
+    except ValueError:
+        return None
+    
+    hue, saturation, value = colorsys.rgb_to_hsv(red, green, blue)
+    if value < COLOR_DARK_VALUE:
+        return "Black"
+    if saturation < COLOR_NEUTRAL_SATURATION:
+        return "White" if value > 0.85 else "Grey"
+    # Dark oranges and yellows read as brown
+    if 15 <= hue * 360 < 45 and value < 0.6:
+        return "Brown"
+    family = next((family for bound, family in COLOR_FAMILY_HUES if hue * 360 < bound), "Red")
+    # Pale reds read as pink
+    if family == "Red" and saturation < 0.4 and value > 0.8:
+        return "Pink"
+    return family
+
+def parse_occasions(occasion):
+    """Get the list of occasions stored in the occasion JSON column"""
+    if not occasion:
+        return []
+    try:
+        occasion_data = json.loads(occasion) if isinstance(occasion, str) else occasion
+    except (json.JSONDecodeError, TypeError):
+        return [occasion]
+    if isinstance(occasion_data, list):
+        return [str(value) for value in occasion_data]
+    return [str(occasion_data)]
+
+def _parse_timestamp(value):
+    """Convert an ISO date string from the date_added column to a datetime"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.now()
+
+def _save_item_tags(cursor, item_id, seasons, occasions):
+    """Write the season and occasion join table rows of a clothing item"""
+    for season in dict.fromkeys(seasons):
+        execute(cursor,
+            'INSERT INTO clothing_item_seasons (item_id, season) VALUES (%s, %s) ON CONFLICT DO NOTHING',
+            (item_id, season)
         )
-        ''')
+    for occasion in dict.fromkeys(occasions):
+        execute(cursor,
+            'INSERT INTO clothing_item_occasions (item_id, occasion) VALUES (%s, %s) ON CONFLICT DO NOTHING',
+            (item_id, occasion)
+        )
+
+def backfill_clothing_items(batch_size=500):
+    """
+    Populate the typed columns and join tables for rows saved before the schema migration
+    
+    Rows are processed in batches, each in its own transaction, so the
+    backfill can be interrupted and resumed.
+    
+    Args:
+        batch_size (int): Number of rows to convert per transaction
         
-        # Insert themes
-        for theme in themes:
-            cursor.execute(
-                'INSERT INTO themes (name, description, categories) VALUES (%s, %s, %s)',
-                theme
+    Returns:
+        int: Number of rows backfilled
+    """
+    total = 0
+    while True:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            execute(cursor,
+                'SELECT id, color, occasion, date_added FROM clothing_items WHERE added_at IS NULL ORDER BY id LIMIT %s',
+                (batch_size,)
             )
-    
-    conn.commit()
-    conn.close()
+            rows = cursor.fetchall()
+            
+            for item_id, color, occasion, date_added in rows:
+                info = parse_color_info(color)
+                execute(cursor,
+                    '''UPDATE clothing_items
+                    SET section = %s, color_name = %s, primary_color = %s, secondary_color = %s, brand = %s, added_at = %s
+                    WHERE id = %s''',
+                    (info["section"], info["name"], info["primary"], info["secondary"], info["brand"],
+                     _parse_timestamp(date_added), item_id)
+                )
+                _save_item_tags(cursor, item_id, info["seasons"], parse_occasions(occasion))
+        
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+# Columns written for a new clothing item, in the order of the rows built by _prepare_item
+_ITEM_INSERT_COLUMNS = ['name', 'category', 'color', 'occasion', 'filename', 'date_added',
+                        'section', 'color_name', 'primary_color', 'secondary_color', 'brand', 'added_at',
+                        'content_hash', 'phash', 'image_width', 'image_height']
+
+_ITEM_INSERT = '''INSERT INTO clothing_items
+            (name, category, color, occasion, filename, date_added,
+             section, color_name, primary_color, secondary_color, brand, added_at, content_hash, phash,
+             image_width, image_height)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id'''
 
-def save_clothing_item(name, category, color, occasion, filename):
-    """Save a clothing item to the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _prepare_item(name, category, color, occasion, filename, section=None, brand=None, seasons=None,
+                  content_hash=None, phash=None, image_size=None):
+    """Build the clothing_items row, seasons, occasions and listener record of a new item"""
+    info = parse_color_info(color)
+    section = section or info["section"]
+    brand = brand or info["brand"]
+    seasons = seasons if seasons is not None else info["seasons"]
+    occasions = parse_occasions(occasion)
     
     # Convert occasion list to JSON string
     if isinstance(occasion, list):
         occasion = json.dumps(occasion)
     
-    cursor.execute(
-        'INSERT INTO clothing_items (name, category, color, occasion, filename, date_added) VALUES (%s, %s, %s, %s, %s, %s)',
-        (name, category, color, occasion, filename, datetime.now().isoformat())
+    added_at = datetime.now()
+    date_added = added_at.isoformat()
+    image_width, image_height = image_size or (None, None)
+    row = (name, category, color, occasion, filename, date_added,
+           section, info["name"], info["primary"], info["secondary"], brand, added_at, content_hash, phash,
+           image_width, image_height)
+    return row, seasons, occasions
+
+def _record_for_row(item_id, row):
+    """The ITEM_COLUMNS record of a row built by _prepare_item"""
+    return (item_id,) + row[:6]
+
+def save_clothing_item(name, category, color, occasion, filename, section=None, brand=None, seasons=None,
+                       content_hash=None, phash=None, image_size=None):
+    """
+    Save a clothing item to the database
+    
+    The color JSON is kept for display, and its fields are also written to
+    typed columns so filtering and sorting can be done in SQL.
+    
+    Args:
+        name (str): Item name
+        category (str): Item category
+        color (str): Color JSON string (name, primary, secondary, section, brand, seasons)
+        occasion (list): Suitable occasions
+        filename (str): Image filename
+        section (str, optional): Wardrobe section, overrides the one in the color JSON
+        brand (str, optional): Brand, overrides the one in the color JSON
+        seasons (list, optional): Suitable seasons, override the ones in the color JSON
+        content_hash (str, optional): Hash of the decoded image pixels
+        phash (str, optional): Perceptual hash of the image
+        image_size (tuple, optional): (width, height) of the image in pixels
+        
+    Returns:
+        int: ID of the new clothing item
+    """
+    row, seasons, occasions = _prepare_item(name, category, color, occasion, filename, section, brand, seasons,
+                                            content_hash, phash, image_size)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, _ITEM_INSERT, row)
+        item_id = cursor.fetchone()[0]
+        _save_item_tags(cursor, item_id, seasons, occasions)
+        _update_wardrobe_stats(cursor, _item_stat_keys(row[1], row[6], seasons, row[8]))
+        version = bump_version(cursor, "clothing_items")
+    
+    # Other processes see the new counts once their cache TTL runs out
+    get_cache("wardrobe_stats").clear()
+    _notify_item_saved(_record_for_row(item_id, row))
+    record_local_change("clothing_items", version)
+    return item_id
+
+def save_clothing_items_bulk(items):
+    """
+    Save many clothing items in a single transaction
+    
+    Args:
+        items (list): Dicts with the keyword arguments of save_clothing_item
+        
+    Returns:
+        list: IDs of the new clothing items, in the same order as items
+    """
+    prepared = [_prepare_item(**item) for item in items]
+    if not prepared:
+        return []
+    
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        item_ids = _insert_many(cursor, 'clothing_items', _ITEM_INSERT_COLUMNS,
+                                [row for row, _, _ in prepared], returning_ids=True)
+        
+        season_rows = [(item_id, season) for item_id, (_, seasons, _) in zip(item_ids, prepared)
+                       for season in dict.fromkeys(seasons)]
+        occasion_rows = [(item_id, occasion) for item_id, (_, _, occasions) in zip(item_ids, prepared)
+                         for occasion in dict.fromkeys(occasions)]
+        _insert_many(cursor, 'clothing_item_seasons', ['item_id', 'season'], season_rows, ignore_conflicts=True)
+        _insert_many(cursor, 'clothing_item_occasions', ['item_id', 'occasion'], occasion_rows,
+                     ignore_conflicts=True)
+        _update_wardrobe_stats(cursor, [key for row, seasons, _ in prepared
+                                        for key in _item_stat_keys(row[1], row[6], seasons, row[8])])
+        version = bump_version(cursor, "clothing_items")
+    
+    get_cache("wardrobe_stats").clear()
+    for item_id, (row, _, _) in zip(item_ids, prepared):
+        _notify_item_saved(_record_for_row(item_id, row))
+    record_local_change("clothing_items", version)
+    return item_ids
+
+def _item_stat_keys(category, section, seasons, primary_color):
+    """The (kind, value) wardrobe_stats rows an item is counted in"""
+    keys = [("total", "all"), ("category", category), ("section", section or DEFAULT_SECTION)]
+    keys += [("season", season) for season in dict.fromkeys(seasons)]
+    family = color_family(primary_color)
+    if family:
+        keys.append(("color_family", family))
+    return keys
+
+def _update_wardrobe_stats(cursor, keys, delta=1):
+    """
+    Add delta to the wardrobe_stats counts of the given keys inside an open transaction
+    
+    Args:
+        cursor: Cursor of the transaction that saves or deletes the items
+        keys (list): (kind, value) pairs, repeated once per item
+        delta (int): 1 for saved items, -1 for deleted ones
+    """
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + delta
+    if not counts:
+        return
+    
+    executemany(cursor,
+        '''INSERT INTO wardrobe_stats (kind, value, count) VALUES (%s, %s, %s)
+        ON CONFLICT (kind, value) DO UPDATE SET count = wardrobe_stats.count + EXCLUDED.count''',
+        [(kind, value, count) for (kind, value), count in counts.items()]
     )
+    if delta < 0:
+        execute(cursor, 'DELETE FROM wardrobe_stats WHERE count <= 0')
+    bump_version(cursor, "wardrobe_stats")
+
+def init_wardrobe_stats():
+    """
+    Create the wardrobe_stats table and (re)count it from the clothing items
     
-    conn.commit()
-    conn.close()
+    Applied once per process by migrations.run_migrations(); afterwards the
+    counts are kept up to date by the functions that save and delete items.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS wardrobe_stats (
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (kind, value)
+        )
+        ''')
+        execute(cursor, 'DELETE FROM wardrobe_stats')
+        
+        rows = []
+        execute(cursor, 'SELECT COUNT(*) FROM clothing_items')
+        rows.append(("total", "all", cursor.fetchone()[0]))
+        execute(cursor, 'SELECT category, COUNT(*) FROM clothing_items GROUP BY category')
+        rows += [("category", category, count) for category, count in cursor.fetchall()]
+        execute(cursor, 'SELECT COALESCE(section, %s), COUNT(*) FROM clothing_items GROUP BY 1', (DEFAULT_SECTION,))
+        rows += [("section", section, count) for section, count in cursor.fetchall()]
+        execute(cursor, 'SELECT season, COUNT(*) FROM clothing_item_seasons GROUP BY season')
+        rows += [("season", season, count) for season, count in cursor.fetchall()]
+        
+        families = {}
+        execute(cursor, 'SELECT primary_color, COUNT(*) FROM clothing_items GROUP BY primary_color')
+        for primary_color, count in cursor.fetchall():
+            family = color_family(primary_color)
+            if family:
+                families[family] = families.get(family, 0) + count
+        rows += [("color_family", family, count) for family, count in families.items()]
+        
+        _insert_many(cursor, 'wardrobe_stats', ['kind', 'value', 'count'], [row for row in rows if row[2] > 0])
+        bump_version(cursor, "wardrobe_stats")
+    get_cache("wardrobe_stats").clear()
 
-def get_clothing_items():
-    """Get all clothing items from the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+@cached("wardrobe_stats")
+def _get_wardrobe_stat_rows():
+    """Get the (kind, value, count) rows of the wardrobe_stats table, cached per process"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, 'SELECT kind, value, count FROM wardrobe_stats')
+        return tuple(cursor.fetchall())
+
+def get_wardrobe_stats():
+    """
+    Get the precomputed wardrobe counts
     
-    cursor.execute('SELECT * FROM clothing_items ORDER BY date_added DESC')
-    items = cursor.fetchall()
+    Returns:
+        dict: "total" item count, and for "category", "section", "season" and
+        "color_family" a dict mapping each value present in the wardrobe to
+        its number of items
+    """
+    stats = {kind: {} for kind in STAT_KINDS}
+    try:
+        rows = _get_wardrobe_stat_rows()
+    except DB_ERRORS as e:
+        print(f"Error retrieving wardrobe statistics: {e}")
+        rows = ()
     
-    conn.close()
-    return items
+    for kind, value, count in rows:
+        stats.setdefault(kind, {})[value] = count
+    stats["total"] = stats["total"].get("all", 0)
+    return stats
 
-def get_clothing_by_category(category):
-    """Get clothing items by category"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def delete_clothing_item(item_id):
+    """
+    Delete a clothing item and its season and occasion tags
     
-    cursor.execute('SELECT * FROM clothing_items WHERE category = %s', (category,))
-    items = cursor.fetchall()
+    Args:
+        item_id (int): ID of the item to delete
+        
+    Returns:
+        bool: True if the item existed
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Read the stat keys from the rows actually deleted, so when two
+        # sessions delete the same item only the one that removed it
+        # decrements the statistics
+        execute(cursor, 'DELETE FROM clothing_item_seasons WHERE item_id = %s RETURNING season', (item_id,))
+        seasons = [season for season, in cursor.fetchall()]
+        execute(cursor, 'DELETE FROM clothing_item_occasions WHERE item_id = %s', (item_id,))
+        execute(cursor,
+            'DELETE FROM clothing_items WHERE id = %s RETURNING category, section, primary_color',
+            (item_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        
+        _update_wardrobe_stats(cursor, _item_stat_keys(row[0], row[1], seasons, row[2]), -1)
+        version = bump_version(cursor, "clothing_items")
     
-    conn.close()
-    return items
+    get_cache("wardrobe_stats").clear()
+    _notify_item_deleted(item_id)
+    record_local_change("clothing_items", version)
+    return True
+
+def get_clothing_items():
+    """Get all clothing items from the database"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, f'SELECT {ITEM_COLUMNS} FROM clothing_items ORDER BY added_at DESC, id DESC')
+        return cursor.fetchall()
+
+def get_clothing_by_category(category):
+    """Get clothing items by category"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, f'SELECT {ITEM_COLUMNS} FROM clothing_items WHERE category = %s', (category,))
+        return cursor.fetchall()
 
 def get_clothing_item(item_id):
     """Get a specific clothing item by ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, f'SELECT {ITEM_COLUMNS} FROM clothing_items WHERE id = %s', (item_id,))
+        return cursor.fetchone()
+
+def _phash_band(band):
+    """SQL expression of one band of the perceptual hash (matches the band indexes)"""
+    return f'SUBSTR(phash, {2 * band + 1}, 2)'
+
+def init_phash_index():
+    """Create the expression indexes on the perceptual hash bands used by get_item_phashes"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        for band in range(PHASH_BANDS):
+            execute(cursor,
+                f'CREATE INDEX IF NOT EXISTS idx_clothing_items_phash_{band} ON clothing_items (({_phash_band(band)}))'
+            )
+
+def get_item_phashes(bands=None):
+    """
+    Get the perceptual hashes of the clothing items that have one
+    
+    Args:
+        bands (list, optional): The PHASH_BANDS hex digit pairs of a hash; only
+            items sharing at least one of them are returned (default: every item)
+    
+    Returns:
+        list: (item ID, name, perceptual hash) tuples
+    """
+    query = 'SELECT id, name, phash FROM clothing_items WHERE phash IS NOT NULL'
+    params = ()
+    if bands is not None:
+        query += ' AND (' + ' OR '.join(f'{_phash_band(band)} = %s' for band in range(len(bands))) + ')'
+        params = tuple(bands)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, query, params)
+        return cursor.fetchall()
+
+def get_item_content_hashes():
+    """Get the set of image content hashes already in the wardrobe"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, 'SELECT DISTINCT content_hash FROM clothing_items WHERE content_hash IS NOT NULL')
+        return {row[0] for row in cursor.fetchall()}
+
+def get_clothing_items_by_ids(item_ids):
+    """
+    Get several clothing items in a single query
+    
+    Args:
+        item_ids (list): IDs of the items to fetch
+        
+    Returns:
+        dict: Mapping of item ID to clothing item record (missing IDs are omitted)
+    """
+    item_ids = list(dict.fromkeys(int(item_id) for item_id in item_ids))
+    if not item_ids:
+        return {}
+    
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, f'SELECT {ITEM_COLUMNS} FROM clothing_items WHERE id IN ({placeholders})', tuple(item_ids))
+        items = cursor.fetchall()
+    
+    return {item[0]: item for item in items}
+
+def get_item_dimensions(item_ids):
+    """
+    Get the stored image sizes of several clothing items in a single query
+    
+    Args:
+        item_ids (list): IDs of the items
+        
+    Returns:
+        dict: Mapping of item ID to (width, height) (items without a stored size are omitted)
+    """
+    item_ids = list(dict.fromkeys(int(item_id) for item_id in item_ids))
+    if not item_ids:
+        return {}
     
-    cursor.execute('SELECT * FROM clothing_items WHERE id = %s', (item_id,))
-    item = cursor.fetchone()
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            f'''SELECT id, image_width, image_height FROM clothing_items
+            WHERE id IN ({placeholders}) AND image_width IS NOT NULL AND image_height IS NOT NULL''',
+            tuple(item_ids)
+        )
+        return {item_id: (width, height) for item_id, width, height in cursor.fetchall()}
+
+def get_items_by_categories(categories):
+    """
+    Get the clothing items of several categories in a single query
+    
+    Args:
+        categories (list): Category names to fetch
+        
+    Returns:
+        dict: Mapping of category to its items, newest first (empty categories are omitted)
+    """
+    categories = list(dict.fromkeys(categories))
+    if not categories:
+        return {}
+    
+    placeholders = ', '.join(['%s'] * len(categories))
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            f'SELECT {ITEM_COLUMNS} FROM clothing_items WHERE category IN ({placeholders}) ORDER BY added_at DESC, id DESC',
+            tuple(categories)
+        )
+        items = cursor.fetchall()
+    
+    items_by_category = {}
+    for item in items:
+        items_by_category.setdefault(item[2], []).append(item)
+    return items_by_category
+
+def item_filters(category=None, section=None, text=None):
+    """Build the WHERE conditions and parameters shared by the wardrobe queries"""
+    conditions = []
+    params = []
+    
+    if category:
+        conditions.append('category = %s')
+        params.append(category)
+    
+    if section:
+        if section == DEFAULT_SECTION:
+            # Items saved without a section belong to the default one
+            conditions.append('(section = %s OR section IS NULL)')
+        else:
+            conditions.append('section = %s')
+        params.append(section)
+    
+    if text:
+        pattern = '%' + text.lower().replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+        conditions.append(
+            "(LOWER(name) LIKE %s ESCAPE '!' OR LOWER(category) LIKE %s ESCAPE '!' OR LOWER(color_name) LIKE %s ESCAPE '!')"
+        )
+        params.extend([pattern, pattern, pattern])
+    
+    return conditions, params
+
+def query_clothing_items(category=None, section=None, text=None, sort="newest", limit=24, offset=0, after=None):
+    """
+    Get one page of clothing items, filtered and sorted in the database
+    
+    Pages are addressed with keyset pagination: pass the cursor returned for
+    one page as `after` to get the next one, which costs the same for every
+    page. `offset` is applied after the cursor and is only meant for small
+    jumps.
+    
+    Args:
+        category (str, optional): Category to match
+        section (str, optional): Section to match
+        text (str, optional): Text to look for in the name, category or color name
+        sort (str): One of "newest", "oldest", "name_asc" or "name_desc"
+        limit (int): Maximum number of items to return
+        offset (int): Number of items to skip
+        after (tuple, optional): Cursor of the previous page
+        
+    Returns:
+        tuple: (list of clothing item records, cursor for the next page or None)
+    """
+    if sort not in ITEM_SORTS:
+        raise ValueError(f"Unknown sort order: {sort}")
+    sort_key, direction = ITEM_SORTS[sort]
+    
+    conditions, params = item_filters(category, section, text)
+    if after is not None:
+        comparison = '<' if direction == 'DESC' else '>'
+        conditions.append(f'({sort_key}, id) {comparison} (%s, %s)')
+        params.extend(after)
     
-    conn.close()
-    return item
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Fetch one extra row to know whether there is a next page
+        execute(cursor,
+            f'''SELECT {ITEM_COLUMNS}, {sort_key} FROM clothing_items {where}
+            ORDER BY {sort_key} {direction}, id {direction} LIMIT %s OFFSET %s''',
+            tuple(params) + (limit + 1, offset)
+        )
+        rows = cursor.fetchall()
+    
+    items = [row[:-1] for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and items:
+        next_cursor = (rows[limit - 1][-1], items[-1][0])
+    return items, next_cursor
+
+def count_clothing_items(category=None, section=None, text=None):
+    """
+    Count the clothing items matching the wardrobe filters
+    
+    Returns:
+        int: Number of matching items
+    """
+    conditions, params = item_filters(category, section, text)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, f'SELECT COUNT(*) FROM clothing_items {where}', tuple(params))
+        return cursor.fetchone()[0]
+
+@cached("themes")
+def _get_theme_rows():
+    """Get the (name, categories JSON) rows of the themes table, cached per process"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, 'SELECT name, categories FROM themes ORDER BY id')
+        return tuple(cursor.fetchall())
 
 def get_themes():
     """Get all available themes"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('SELECT name FROM themes')
-        themes = [theme[0] for theme in cursor.fetchall()]
-    except psycopg2.Error as e:
+        themes = [theme[0] for theme in _get_theme_rows()]
+    except DB_ERRORS as e:
         print(f"Error retrieving themes: {e}")
         themes = []
     
-    conn.close()
     return themes
 
 def get_theme_categories(theme_name):
     """Get the categories for a specific theme"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT categories FROM themes WHERE name = %s', (theme_name,))
-    result = cursor.fetchone()
-    
-    conn.close()
-    
-    if result:
-        return json.loads(result[0])
+    for name, categories in _get_theme_rows():
+        if name == theme_name:
+            return json.loads(categories)
     return []
 
 def save_outfit_feedback(outfit_items, theme, rating, feedback_text=""):
@@ -197,20 +806,51 @@ def save_outfit_feedback(outfit_items, theme, rating, feedback_text=""):
         rating (int): User rating (1-5)
         feedback_text (str): Optional feedback comments
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     # Convert outfit items list to JSON string
     if isinstance(outfit_items, list):
         outfit_items = json.dumps(outfit_items)
     
-    cursor.execute(
-        'INSERT INTO outfit_feedback (outfit_items, theme, rating, feedback_text, date_added) VALUES (%s, %s, %s, %s, %s)',
-        (outfit_items, theme, rating, feedback_text, datetime.now().isoformat())
-    )
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            'INSERT INTO outfit_feedback (outfit_items, theme, rating, feedback_text, date_added) VALUES (%s, %s, %s, %s, %s)',
+            (outfit_items, theme, rating, feedback_text, datetime.now().isoformat())
+        )
+        version = bump_version(cursor, "outfit_feedback")
     
-    conn.commit()
-    conn.close()
+    _notify_feedback_saved(outfit_items, theme, rating)
+    record_local_change("outfit_feedback", version)
+
+def save_outfit_feedback_bulk(feedback):
+    """
+    Save many outfit feedback records in a single transaction
+    
+    Args:
+        feedback (list): (outfit_items, theme, rating, feedback_text) tuples, as taken by save_outfit_feedback
+        
+    Returns:
+        list: IDs of the new feedback records, in the same order as feedback
+    """
+    date_added = datetime.now().isoformat()
+    rows = []
+    for outfit_items, theme, rating, feedback_text in feedback:
+        if isinstance(outfit_items, list):
+            outfit_items = json.dumps(outfit_items)
+        rows.append((outfit_items, theme, rating, feedback_text or "", date_added))
+    if not rows:
+        return []
+    
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        feedback_ids = _insert_many(cursor, 'outfit_feedback',
+                                    ['outfit_items', 'theme', 'rating', 'feedback_text', 'date_added'],
+                                    rows, returning_ids=True)
+        version = bump_version(cursor, "outfit_feedback")
+    
+    for outfit_items, theme, rating, _, _ in rows:
+        _notify_feedback_saved(outfit_items, theme, rating)
+    record_local_change("outfit_feedback", version)
+    return feedback_ids
 
 def get_outfit_feedback(theme=None):
     """
@@ -222,18 +862,15 @@ def get_outfit_feedback(theme=None):
     Returns:
         list: List of feedback records
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if theme:
-        cursor.execute('SELECT * FROM outfit_feedback WHERE theme = %s ORDER BY date_added DESC', (theme,))
-    else:
-        cursor.execute('SELECT * FROM outfit_feedback ORDER BY date_added DESC')
+    with db_connection() as conn:
+        cursor = conn.cursor()
         
-    items = cursor.fetchall()
-    
-    conn.close()
-    return items
+        if theme:
+            execute(cursor, 'SELECT * FROM outfit_feedback WHERE theme = %s ORDER BY date_added DESC', (theme,))
+        else:
+            execute(cursor, 'SELECT * FROM outfit_feedback ORDER BY date_added DESC')
+            
+        return cursor.fetchall()
 
 def get_top_rated_outfits(theme=None, limit=5):
     """
@@ -246,21 +883,147 @@ def get_top_rated_outfits(theme=None, limit=5):
     Returns:
         list: List of top-rated outfit records
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        if theme:
+            execute(cursor,
+                'SELECT * FROM outfit_feedback WHERE theme = %s ORDER BY rating DESC, date_added DESC LIMIT %s', 
+                (theme, limit)
+            )
+        else:
+            execute(cursor,
+                'SELECT * FROM outfit_feedback ORDER BY rating DESC, date_added DESC LIMIT %s',
+                (limit,)
+            )
+            
+        return cursor.fetchall()
+
+def create_background_job(filename):
+    """
+    Queue a background removal job for an uploaded image
     
-    if theme:
-        cursor.execute(
-            'SELECT * FROM outfit_feedback WHERE theme = %s ORDER BY rating DESC, date_added DESC LIMIT %s', 
-            (theme, limit)
-        )
-    else:
-        cursor.execute(
-            'SELECT * FROM outfit_feedback ORDER BY rating DESC, date_added DESC LIMIT %s',
-            (limit,)
+    Args:
+        filename (str): Image filename in the upload folder
+        
+    Returns:
+        int: ID of the new job
+    """
+    now = datetime.now()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            'INSERT INTO background_jobs (filename, status, created_at, updated_at) VALUES (%s, %s, %s, %s) RETURNING id',
+            (filename, 'pending', now, now)
         )
+        return cursor.fetchone()[0]
+
+def init_background_job_attempts():
+    """Add the attempts counter used to stop requeuing jobs that keep killing their worker"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, 'SELECT * FROM background_jobs LIMIT 0')
+        if 'attempts' not in {column[0] for column in cursor.description}:
+            execute(cursor, 'ALTER TABLE background_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+
+def claim_background_jobs(limit):
+    """
+    Atomically mark up to `limit` pending jobs as running
+    
+    The status is re-checked by the UPDATE itself, so concurrent workers
+    never claim the same job. Every claim counts as an attempt.
+    
+    Args:
+        limit (int): Maximum number of jobs to claim
         
-    items = cursor.fetchall()
+    Returns:
+        list: (job ID, filename) tuples of the claimed jobs
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            '''UPDATE background_jobs SET status = 'running', attempts = attempts + 1, updated_at = %s
+            WHERE status = 'pending' AND id IN (
+                SELECT id FROM background_jobs WHERE status = 'pending' ORDER BY id LIMIT %s
+            )
+            RETURNING id, filename''',
+            (datetime.now(), limit)
+        )
+        return sorted(cursor.fetchall())
+
+def update_background_job(job_id, status, error=None):
+    """
+    Record the outcome of a background job
     
-    conn.close()
-    return items
+    Args:
+        job_id (int): Job ID
+        status (str): New status ('pending', 'running', 'done' or 'failed')
+        error (str, optional): Error message for failed jobs
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            'UPDATE background_jobs SET status = %s, error = %s, updated_at = %s WHERE id = %s',
+            (status, error, datetime.now(), job_id)
+        )
+
+def get_background_job(job_id):
+    """
+    Get a background job by ID
+    
+    Returns:
+        tuple: (id, filename, status, error, created_at, updated_at), or None
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            'SELECT id, filename, status, error, created_at, updated_at FROM background_jobs WHERE id = %s',
+            (job_id,)
+        )
+        return cursor.fetchone()
+
+def release_background_job(job_id, max_attempts, error):
+    """
+    Put a job whose worker died back in the queue, or fail it once it has used up its attempts
+    
+    Args:
+        job_id (int): Job ID
+        max_attempts (int): Attempts after which the job is recorded as failed
+        error (str): Error message recorded with the job
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            '''UPDATE background_jobs
+            SET status = CASE WHEN attempts < %s THEN 'pending' ELSE 'failed' END, error = %s, updated_at = %s
+            WHERE id = %s''',
+            (max_attempts, error, datetime.now(), job_id)
+        )
+
+def requeue_stale_background_jobs(older_than, max_attempts):
+    """
+    Put jobs left running by a worker that died back in the queue
+    
+    A job that has already been claimed `max_attempts` times is recorded as
+    failed instead, so an image that crashes the worker is not retried forever.
+    
+    Args:
+        older_than (datetime): Running jobs last updated before this time are requeued
+        max_attempts (int): Attempts after which a stale job is failed
+        
+    Returns:
+        int: Number of jobs requeued
+    """
+    now = datetime.now()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor,
+            '''UPDATE background_jobs SET status = 'failed', error = %s, updated_at = %s
+            WHERE status = 'running' AND updated_at < %s AND attempts >= %s''',
+            (f"Abandoned by its worker {max_attempts} times", now, older_than, max_attempts)
+        )
+        execute(cursor,
+            "UPDATE background_jobs SET status = 'pending', updated_at = %s WHERE status = 'running' AND updated_at < %s",
+            (now, older_than)
+        )
+        return cursor.rowcount
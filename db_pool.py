@@ -0,0 +1,311 @@
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import psycopg2
+
+# Database settings. Replace the defaults with your pgAdmin database credentials
+# or override them through environment variables.
+DB_CONFIG = {
+    "backend": os.environ.get("FASHIONAIST_DB_BACKEND", "postgres"),
+    "dbname": os.environ.get("FASHIONAIST_DB_NAME", "fashionaist"),
+    "user": os.environ.get("FASHIONAIST_DB_USER", "postgres"),
+    "password": os.environ.get("FASHIONAIST_DB_PASSWORD", "fashionAIst@123"),
+    "host": os.environ.get("FASHIONAIST_DB_HOST", "localhost"),
+    "port": os.environ.get("FASHIONAIST_DB_PORT", "5432"),
+    "sqlite_path": os.environ.get("FASHIONAIST_SQLITE_PATH", "fashionaist.db"),
+    "pool_min": int(os.environ.get("FASHIONAIST_DB_POOL_MIN", "1")),
+    "pool_max": int(os.environ.get("FASHIONAIST_DB_POOL_MAX", "10")),
+    "pool_timeout": float(os.environ.get("FASHIONAIST_DB_POOL_TIMEOUT", "10")),
+    "health_check_interval": float(os.environ.get("FASHIONAIST_DB_HEALTH_CHECK_INTERVAL", "30")),
+}
+
+
+class PoolError(Exception):
+    """Raised when a connection cannot be obtained from the pool"""
+
+
+class PostgresBackend:
+    """Connection factory and SQL dialect for PostgreSQL"""
+
+    name = "postgres"
+    errors = (psycopg2.Error,)
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        return psycopg2.connect(
+            dbname=self.config["dbname"],
+            user=self.config["user"],
+            password=self.config["password"],
+            host=self.config["host"],
+            port=self.config["port"]
+        )
+
+    def adapt(self, query):
+        # Queries in database.py are written for PostgreSQL already
+        return query
+
+    def is_closed(self, conn):
+        return conn.closed != 0
+
+
+# Store timestamps as ISO 8601 text in SQLite so they sort chronologically
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+
+
+class SQLiteBackend:
+    """Connection factory and SQL dialect for a local SQLite file"""
+
+    name = "sqlite"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        # Connections are handed to one thread at a time by the pool
+        conn = sqlite3.connect(self.config["sqlite_path"], timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def adapt(self, query):
+        """Translate the PostgreSQL flavoured SQL used in database.py to SQLite"""
+        return (query
+                .replace('%s', '?')
+                .replace('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT'))
+
+    def is_closed(self, conn):
+        try:
+            conn.total_changes
+        except sqlite3.ProgrammingError:
+            return True
+        return False
+
+
+# Available backends, selected by DB_CONFIG["backend"]
+BACKENDS = {
+    "postgres": PostgresBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def register_backend(name, backend_class):
+    """
+    Register an additional database backend
+
+    Args:
+        name (str): Name used in DB_CONFIG["backend"]
+        backend_class (type): Class implementing connect(), adapt(), is_closed() and errors
+    """
+    BACKENDS[name] = backend_class
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections
+
+    Idle connections are reused instead of opening a new connection per query.
+    Connections that have been idle for longer than health_check_interval are
+    pinged before being handed out and transparently replaced if they are dead.
+    """
+
+    def __init__(self, backend, minconn=1, maxconn=10, timeout=10.0, health_check_interval=30.0):
+        if maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+
+        self.backend = backend
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, time it was returned to the pool)
+        self._size = 0   # connections currently open, idle or checked out
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((backend.connect(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self, timeout=None):
+        """
+        Check a connection out of the pool, opening a new one if allowed
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free connection
+
+        Returns:
+            connection: A healthy database connection
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"Timed out waiting for a database connection ({self.maxconn} in use)")
+                self._cond.wait(remaining)
+
+        # Connect and health check outside the lock so other threads are not blocked
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_since):
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self.backend.connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Return a connection to the pool
+
+        Args:
+            conn: Connection previously obtained from getconn()
+            discard (bool): Close the connection instead of keeping it
+        """
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or self._closed or self.backend.is_closed(conn):
+                self._close_quietly(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that checks out a connection and commits on success
+
+        The transaction is rolled back if the block raises, and connections
+        that were broken by the error are dropped from the pool.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            self.putconn(conn, discard=self.backend.is_closed(conn))
+            raise
+        else:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+                self._size -= 1
+            self._idle = []
+            self._cond.notify_all()
+
+    def _is_healthy(self, conn, idle_since):
+        if self.backend.is_closed(conn):
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            print(f"Dropping unhealthy database connection: {str(e)}")
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                backend_name = DB_CONFIG["backend"]
+                if backend_name not in BACKENDS:
+                    raise ValueError(f"Unknown database backend: {backend_name}")
+                backend = BACKENDS[backend_name](DB_CONFIG)
+                _pool = ConnectionPool(
+                    backend,
+                    minconn=DB_CONFIG["pool_min"],
+                    maxconn=DB_CONFIG["pool_max"],
+                    timeout=DB_CONFIG["pool_timeout"],
+                    health_check_interval=DB_CONFIG["health_check_interval"]
+                )
+    return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for the duration of a with block"""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+atexit.register(close_pool)
+
+
+def execute(cursor, query, params=()):
+    """Execute a query written in PostgreSQL syntax on the active backend"""
+    cursor.execute(get_pool().backend.adapt(query), params)
+
+
+def executemany(cursor, query, rows):
+    """Execute a query written in PostgreSQL syntax once for each row of parameters"""
+    cursor.executemany(get_pool().backend.adapt(query), rows)
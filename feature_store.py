@@ -0,0 +1,143 @@
+import os
+import threading
+import numpy as np
+from classifier import FEATURE_NAMES, extract_features, open_image, working_copy, categorize
+from image_store import content_filename, stored_image_path
+
+# Feature vectors are stored next to the images as <content hash>.npy
+FEATURE_FOLDER = "features"
+
+# Bins per channel of the color histogram appended to the shape and color features
+HISTOGRAM_BINS = 8
+
+# Length of a stored vector: classifier features, then the flattened
+# HISTOGRAM_BINS ** 3 BGR histogram of the item (normalized to sum to 1)
+FEATURE_LENGTH = len(FEATURE_NAMES) + HISTOGRAM_BINS ** 3
+
+def feature_path(image_hash):
+    """Path of the stored feature vector for an image content hash"""
+    return os.path.join(FEATURE_FOLDER, f"{image_hash}.npy")
+
+def color_histogram(image):
+    """
+    Compute the normalized BGR color histogram of the item in an image
+
+    Only foreground pixels (the same threshold the classifier uses) are counted.
+
+    Args:
+        image (PIL.Image): The clothing image
+
+    Returns:
+        numpy.ndarray: Flattened histogram of HISTOGRAM_BINS ** 3 float32 values
+    """
+    import cv2
+
+    img_array = cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
+
+    hist = cv2.calcHist([img_array], [0, 1, 2], mask, [HISTOGRAM_BINS] * 3, [0, 256] * 3).ravel()
+    total = hist.sum()
+    if total > 0:
+        hist /= total
+    return hist.astype(np.float32)
+
+def compute_features(image):
+    """
+    Extract the full stored feature vector of a clothing image
+
+    Args:
+        image (PIL.Image): The clothing image
+
+    Returns:
+        numpy.ndarray: float32 vector of FEATURE_LENGTH values
+    """
+    image = working_copy(image)
+    return np.concatenate([extract_features(image), color_histogram(image)]).astype(np.float32)
+
+def save_features(image_hash, features):
+    """Write a feature vector for an image content hash"""
+    os.makedirs(FEATURE_FOLDER, exist_ok=True)
+    path = feature_path(image_hash)
+    # Write to a temporary file first so readers never see a partial vector
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.save(f, np.asarray(features, dtype=np.float32))
+    os.replace(temp_path, path)
+
+def load_features(image_hash):
+    """
+    Read the stored feature vector of an image content hash
+
+    Returns:
+        numpy.ndarray: The feature vector, or None if it is missing or has an outdated layout
+    """
+    try:
+        features = np.load(feature_path(image_hash))
+    except (OSError, ValueError):
+        return None
+    if features.shape != (FEATURE_LENGTH,):
+        return None
+    return features
+
+def get_features(image_hash, image=None):
+    """
+    Get the feature vector of an image, extracting and storing it on first use
+
+    Args:
+        image_hash (str): Content hash of the image
+        image (PIL.Image, optional): The decoded image, if the caller already has it;
+            otherwise the stored image for the hash is opened
+
+    Returns:
+        numpy.ndarray: float32 vector of FEATURE_LENGTH values
+    """
+    features = load_features(image_hash)
+    if features is not None:
+        return features
+
+    if image is None:
+        features = compute_features(open_image(stored_image_path(content_filename(image_hash))))
+    else:
+        features = compute_features(image)
+    save_features(image_hash, features)
+    return features
+
+def get_features_batch(image_hashes):
+    """
+    Get the feature vectors of many images as one array
+
+    Args:
+        image_hashes (list): Image content hashes
+
+    Returns:
+        numpy.ndarray: Array of shape (len(image_hashes), FEATURE_LENGTH)
+    """
+    if not image_hashes:
+        return np.zeros((0, FEATURE_LENGTH), dtype=np.float32)
+    return np.stack([get_features(image_hash) for image_hash in image_hashes])
+
+def split_features(features):
+    """
+    Split a stored feature vector into named parts
+
+    Returns:
+        dict: Each of FEATURE_NAMES mapped to its value, plus 'histogram'
+            (HISTOGRAM_BINS x HISTOGRAM_BINS x HISTOGRAM_BINS array, BGR order)
+    """
+    parts = {name: float(value) for name, value in zip(FEATURE_NAMES, features)}
+    parts["histogram"] = np.asarray(features[len(FEATURE_NAMES):]).reshape((HISTOGRAM_BINS,) * 3)
+    return parts
+
+def classify_features(features):
+    """
+    Classify clothing items from stored feature vectors without decoding their images
+
+    Args:
+        features (numpy.ndarray): One vector or an array of shape (N, FEATURE_LENGTH)
+
+    Returns:
+        list: Predicted category for each vector
+    """
+    features = np.asarray(features).reshape(-1, FEATURE_LENGTH)
+    return categorize(features[:, :len(FEATURE_NAMES)])
@@ -1,16 +1,45 @@
-import cv2
-import numpy as np
 from PIL import Image
 import io
-from rembg import remove
 import os
+import threading
+from thumbnails import get_thumbnail
+from database import get_clothing_items_by_ids, get_item_dimensions
+from image_store import stored_image_path
 
-def remove_background(image_path):
+# Background removal model and ONNX Runtime thread count (0 lets ONNX Runtime decide)
+REMBG_MODEL = os.environ.get("FASHIONAIST_REMBG_MODEL", "u2net")
+REMBG_THREADS = int(os.environ.get("FASHIONAIST_REMBG_THREADS", "0"))
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_rembg_session():
+    """
+    Get the process-wide rembg session, loading the model on first use
+    
+    Returns:
+        rembg session that is reused by every background removal in this process
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                if REMBG_THREADS > 0:
+                    # rembg reads the ONNX Runtime thread count from OMP_NUM_THREADS
+                    os.environ["OMP_NUM_THREADS"] = str(REMBG_THREADS)
+                # rembg pulls in ONNX Runtime, so it is only imported once a model is needed
+                from rembg import new_session
+                print(f"Loading background removal model: {REMBG_MODEL}")
+                _session = new_session(REMBG_MODEL)
+    return _session
+
+def remove_background(image_path, raise_errors=False):
     """
     Remove the background from an image using rembg
     
     Args:
         image_path (str): Path to the image file
+        raise_errors (bool): Raise when the removal fails instead of returning the original image
         
     Returns:
         PIL.Image: Image with background removed
@@ -30,7 +59,9 @@ def remove_background(image_path):
         
         # Remove background
         print("Starting background removal...")
-        output_data = remove(input_data)
+        session = get_rembg_session()
+        from rembg import remove
+        output_data = remove(input_data, session=session)
         print(f"Background removal complete")
         
         # Convert to PIL Image 
@@ -52,6 +83,8 @@ def remove_background(image_path):
         raise
     except Exception as e:
         print(f"Error removing background: {str(e)}")
+        if raise_errors:
+            raise
         # Return original image if processing fails
         print("Returning original image due to error")
         try:
@@ -62,6 +95,20 @@ def remove_background(image_path):
             placeholder = Image.new('RGBA', (400, 400), (255, 255, 255, 0))
             return placeholder
 
+def remove_background_batch(image_paths):
+    """
+    Remove the background from several images with a single model session
+    
+    Args:
+        image_paths (list): Paths to the image files
+        
+    Returns:
+        list: PIL.Image results in the same order as image_paths
+    """
+    # Load the model once up front rather than inside the first removal
+    get_rembg_session()
+    return [remove_background(path) for path in image_paths]
+
 def resize_image(img, max_width=400, max_height=600):
     """
     Resize an image maintaining aspect ratio
@@ -123,12 +170,94 @@ def resize_image(img, max_width=400, max_height=600):
     
     return img
 
-def combine_outfit_images(image_paths, canvas_width=600, canvas_height=800):
+try:
+    _RESAMPLE = Image.Resampling.LANCZOS
+except AttributeError:
+    _RESAMPLE = Image.LANCZOS
+
+# Rows of the outfit layout from top to bottom, with their relative heights
+LAYOUT_ROWS = [
+    ("accessories", 1.0),
+    ("upper", 2.0),
+    ("full", 4.0),
+    ("lower", 2.0),
+    ("feet", 1.0)
+]
+
+# Layout row of each category (anything else is shown with the upper body items)
+CATEGORY_ROWS = {
+    "Accessory": "accessories",
+    "Top": "upper",
+    "Formal wear": "upper",
+    "Casual wear": "upper",
+    "Dress": "full",
+    "Ethnic wear": "full",
+    "Bottom": "lower",
+    "Footwear": "feet"
+}
+
+# Space kept around each item on the canvas, in pixels
+LAYOUT_PADDING = 10
+
+# Part of the outfit composite cache keys; bump it whenever layout_outfit or
+# combine_outfit_images changes, so composites drawn the old way are rebuilt
+LAYOUT_VERSION = 2
+
+def layout_outfit(items, canvas_width, canvas_height, dimensions):
+    """
+    Place any number of outfit items on a canvas
+    
+    Items are stacked in LAYOUT_ROWS by category; rows without items are
+    dropped and the rest share the canvas height by weight, and the items
+    of a row share its width. Each item is scaled to fit its cell.
+    
+    Args:
+        items (list): Clothing item records (id, name, category, ...)
+        canvas_width (int): Width of the canvas
+        canvas_height (int): Height of the canvas
+        dimensions (dict): Mapping of item ID to image (width, height)
+        
+    Returns:
+        list: (item, (x, y), (width, height)) placements, for items with known dimensions
+    """
+    rows = {}
+    for item in items:
+        if item[0] in dimensions:
+            rows.setdefault(CATEGORY_ROWS.get(item[2], "upper"), []).append(item)
+    
+    used_rows = [(name, weight) for name, weight in LAYOUT_ROWS if name in rows]
+    total_weight = sum(weight for _, weight in used_rows)
+    
+    placements = []
+    y = 0.0
+    for name, weight in used_rows:
+        row_height = canvas_height * weight / total_weight
+        row_items = rows[name]
+        cell_width = canvas_width / len(row_items)
+        for column, item in enumerate(row_items):
+            image_width, image_height = dimensions[item[0]]
+            max_width = max(1, cell_width - 2 * LAYOUT_PADDING)
+            max_height = max(1, row_height - 2 * LAYOUT_PADDING)
+            scale = min(max_width / image_width, max_height / image_height)
+            width = max(1, int(image_width * scale))
+            height = max(1, int(image_height * scale))
+            # Center the item in its cell
+            x = int(column * cell_width + (cell_width - width) / 2)
+            top = int(y + (row_height - height) / 2)
+            placements.append((item, (x, top), (width, height)))
+        y += row_height
+    
+    return placements
+
+def combine_outfit_images(items, canvas_width=600, canvas_height=800):
     """
     Combine multiple clothing item images to create an outfit visualization
     
+    The layout is computed from the items' categories and stored image
+    sizes, so only the images that are placed get opened.
+    
     Args:
-        image_paths (list): List of image paths to combine
+        items (list): Clothing item records, or item IDs to look up in one query
         canvas_width (int): Width of the canvas
         canvas_height (int): Height of the canvas
         
@@ -138,89 +267,30 @@ def combine_outfit_images(image_paths, canvas_width=600, canvas_height=800):
     # Create a transparent canvas
     canvas = Image.new('RGBA', (canvas_width, canvas_height), (255, 255, 255, 0))
     
-    if not image_paths:
+    if not items:
         return canvas
     
-    # Calculate positions based on number of items
-    num_items = len(image_paths)
-    
-    # Load and position images based on their categories
-    top_position = (canvas_width // 2, canvas_height // 4)
-    bottom_position = (canvas_width // 2, canvas_height // 2)
-    # Convert float division to integer for dress position
-    dress_position = (canvas_width // 2, int(canvas_height // 2.5))
-    footwear_position = (canvas_width // 2, 3 * canvas_height // 4)
-    accessory_positions = [
-        (canvas_width // 4, canvas_height // 5),
-        (3 * canvas_width // 4, canvas_height // 5)
-    ]
-    
-    # Track placed categories to avoid duplicates
-    placed_categories = set()
-    accessory_count = 0
-    
-    # First pass for main clothing items (tops, bottoms, dresses)
-    for path in image_paths:
-        if not os.path.exists(path):
-            continue
-            
+    if not isinstance(items[0], tuple):
+        item_map = get_clothing_items_by_ids(items)
+        items = [item_map[int(item_id)] for item_id in items if int(item_id) in item_map]
+    
+    # Image sizes come from the database; read the file header only for older items
+    dimensions = get_item_dimensions([item[0] for item in items])
+    for item in items:
+        if item[0] not in dimensions:
+            try:
+                with Image.open(stored_image_path(item[5])) as img:
+                    dimensions[item[0]] = img.size
+            except Exception as e:
+                print(f"Error reading image size for item {item[0]}: {str(e)}")
+    
+    for item, position, size in layout_outfit(items, canvas_width, canvas_height, dimensions):
+        path = stored_image_path(item[5])
         try:
-            img = Image.open(path)
-            
-            # Determine category from filename
-            filename = os.path.basename(path)
-            category = None
-            
-            # Get category from database - for now use a simple approach
-            if "Top" in filename or "top" in filename:
-                category = "Top"
-            elif "Bottom" in filename or "bottom" in filename:
-                category = "Bottom"
-            elif "Dress" in filename or "dress" in filename:
-                category = "Dress"
-            elif "Footwear" in filename or "footwear" in filename:
-                category = "Footwear"
-            elif "Accessory" in filename or "accessory" in filename:
-                category = "Accessory"
-            elif "Ethnic" in filename or "ethnic" in filename:
-                category = "Ethnic wear"
-            
-            # Resize image
-            if category == "Top" and "Top" not in placed_categories:
-                img = resize_image(img, max_width=canvas_width // 2, max_height=canvas_height // 3)
-                position = top_position
-                placed_categories.add("Top")
-            elif category == "Bottom" and "Bottom" not in placed_categories:
-                img = resize_image(img, max_width=canvas_width // 2, max_height=canvas_height // 3)
-                position = bottom_position
-                placed_categories.add("Bottom")
-            elif category == "Dress" and "Dress" not in placed_categories:
-                img = resize_image(img, max_width=canvas_width // 2, max_height=canvas_height // 2)
-                position = dress_position
-                placed_categories.add("Dress")
-            elif category == "Footwear" and "Footwear" not in placed_categories:
-                img = resize_image(img, max_width=canvas_width // 3, max_height=canvas_height // 4)
-                position = footwear_position
-                placed_categories.add("Footwear")
-            elif category == "Accessory" and accessory_count < len(accessory_positions):
-                img = resize_image(img, max_width=canvas_width // 4, max_height=canvas_height // 5)
-                position = accessory_positions[accessory_count]
-                accessory_count += 1
-            elif category == "Ethnic wear" and "Ethnic wear" not in placed_categories:
-                img = resize_image(img, max_width=canvas_width // 2, max_height=canvas_height // 2)
-                position = dress_position
-                placed_categories.add("Ethnic wear")
-            else:
-                # Skip items that don't fit in our layout
-                continue
-            
-            # Calculate position to center the image
-            x = position[0] - img.width // 2
-            y = position[1] - img.height // 2
-            
-            # Paste the image onto the canvas
-            canvas.paste(img, (x, y), img)
-            
+            # Paste the pre-scaled canvas thumbnail instead of the full image
+            with Image.open(get_thumbnail(path, "canvas")) as thumbnail:
+                img = thumbnail.convert("RGBA").resize(size, _RESAMPLE)
+            canvas.paste(img, position, img)
         except Exception as e:
             print(f"Error processing image {path}: {str(e)}")
     
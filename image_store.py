@@ -0,0 +1,119 @@
+import os
+import hashlib
+import threading
+from PIL import Image
+from database import PHASH_BANDS, get_item_phashes
+
+UPLOAD_FOLDER = "uploaded_images"
+PROCESSED_FOLDER = "processed_images"
+
+# Images whose perceptual hashes differ in at most this many bits are near-duplicates
+NEAR_DUPLICATE_DISTANCE = 6
+
+def content_hash(image):
+    """
+    Hash the decoded pixels of an image
+
+    Identical pictures get the same hash regardless of the file format,
+    metadata or compression they were uploaded with.
+
+    Args:
+        image (PIL.Image): Image to hash
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    rgba = image.convert("RGBA")
+    digest = hashlib.sha256(f"{rgba.width}x{rgba.height}:".encode())
+    digest.update(rgba.tobytes())
+    return digest.hexdigest()
+
+def perceptual_hash(image, hash_size=8):
+    """
+    Compute a difference hash (dHash) that survives resizing and recompression
+
+    Args:
+        image (PIL.Image): Image to hash
+        hash_size (int): Hash width in bits per row (the hash has hash_size ** 2 bits)
+
+    Returns:
+        str: Hash as a hex string
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+def hamming_distance(hash_a, hash_b):
+    """Number of differing bits between two hex perceptual hashes"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+def find_near_duplicates(phash, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    Find wardrobe items whose image looks like the given one
+
+    Args:
+        phash (str): Perceptual hash of the new image
+        max_distance (int): Maximum number of differing hash bits
+
+    Returns:
+        list: (item ID, name, distance) tuples, closest first
+    """
+    bands = None
+    if max_distance < PHASH_BANDS and len(phash) == 2 * PHASH_BANDS:
+        # A hash differing in fewer bits than there are bands matches at
+        # least one band exactly, so only those items need comparing
+        bands = [phash[2 * band:2 * band + 2] for band in range(PHASH_BANDS)]
+
+    matches = []
+    for item_id, name, item_phash in get_item_phashes(bands):
+        distance = hamming_distance(phash, item_phash)
+        if distance <= max_distance:
+            matches.append((item_id, name, distance))
+    return sorted(matches, key=lambda match: match[2])
+
+def content_filename(image_hash):
+    """Filename of the stored image for a content hash"""
+    return f"{image_hash}.png"
+
+def store_upload(image, image_hash=None):
+    """
+    Save an uploaded image under its content hash
+
+    Args:
+        image (PIL.Image): Uploaded image
+        image_hash (str, optional): Content hash of the image if already computed
+
+    Returns:
+        tuple: (filename, content hash, perceptual hash, True if the image was not stored yet)
+    """
+    image_hash = image_hash or content_hash(image)
+    filename = content_filename(image_hash)
+    upload_path = os.path.join(UPLOAD_FOLDER, filename)
+
+    is_new = not os.path.exists(upload_path)
+    if is_new:
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        # Write to a temporary file first so a concurrent upload never sees a partial image
+        temp_path = f"{upload_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(temp_path, "PNG")
+        os.replace(temp_path, upload_path)
+
+    return filename, image_hash, perceptual_hash(image), is_new
+
+def stored_image_path(filename):
+    """
+    Get the best available image for a stored item
+
+    Returns the background-removed image once it exists and the original
+    upload until then.
+    """
+    processed_path = os.path.join(PROCESSED_FOLDER, filename)
+    if os.path.exists(processed_path):
+        return processed_path
+    return os.path.join(UPLOAD_FOLDER, filename)
@@ -0,0 +1,249 @@
+"""
+Import a folder or zip archive of clothing photos into the wardrobe
+
+Usage: python import_wardrobe.py PATH [--remove-background] [--workers N] [--batch-size N]
+"""
+import io
+import os
+import sys
+import json
+import queue
+import zipfile
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image
+
+from database import DEFAULT_SECTION, get_item_content_hashes, save_clothing_items_bulk
+from migrations import run_migrations
+from image_store import UPLOAD_FOLDER, PROCESSED_FOLDER, content_hash, store_upload
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+# Rows committed per database transaction
+DEFAULT_BATCH_SIZE = 500
+
+# Images queued per worker process, so memory stays bounded for any archive size
+IN_FLIGHT_PER_WORKER = 4
+
+# Finished batches waiting for the database writer
+MAX_PENDING_BATCHES = 2
+
+def _is_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+def iter_sources(path):
+    """
+    List the images to import
+
+    Args:
+        path (str): Directory or zip archive
+
+    Returns:
+        list: (path, zip member name or None) tuples
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(path, member) for member in archive.namelist()
+                    if _is_image(member) and not member.startswith("__MACOSX/")]
+
+    sources = []
+    for folder, _, filenames in os.walk(path):
+        for filename in sorted(filenames):
+            if _is_image(filename):
+                sources.append((os.path.join(folder, filename), None))
+    return sorted(sources)
+
+def item_name(source_name):
+    """Turn a file name like 'blue_linen-shirt.jpg' into 'Blue Linen Shirt'"""
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return ' '.join(stem.replace('_', ' ').replace('-', ' ').split()).title() or "Imported item"
+
+# Zip archives opened by this worker process
+_archives = {}
+
+# Content hashes already in the wardrobe when the import started (set in each worker)
+_known_hashes = frozenset()
+
+def _init_worker(known_hashes):
+    global _known_hashes
+    _known_hashes = known_hashes
+
+def _read_source(path, member):
+    if member is None:
+        with open(path, 'rb') as f:
+            return f.read()
+    archive = _archives.get(path)
+    if archive is None:
+        archive = _archives[path] = zipfile.ZipFile(path)
+    return archive.read(member)
+
+def _process_image(path, member, remove_backgrounds, section):
+    """
+    Decode, store, clean up, classify and thumbnail one image (runs in a worker process)
+
+    Returns:
+        dict: save_clothing_item keyword arguments for the image, or None if
+        the image is already in the wardrobe
+    """
+    from background_jobs import _run_background_removal
+    from feature_store import get_features, classify_features
+    from thumbnails import generate_thumbnails
+
+    with Image.open(io.BytesIO(_read_source(path, member))) as image:
+        image.load()
+        # Skip known images before any of the expensive work
+        image_hash = content_hash(image)
+        if image_hash in _known_hashes:
+            return None
+        image_size = image.size
+        filename, image_hash, image_phash, _ = store_upload(image, image_hash)
+
+    processed = os.path.exists(os.path.join(PROCESSED_FOLDER, filename))
+    if remove_backgrounds and not processed:
+        # Writes the processed image, its thumbnails and its features
+        try:
+            _run_background_removal(filename)
+            processed = True
+        except Exception as e:
+            print(f"Error removing background of {member or path}, keeping the original: {str(e)}")
+    if not processed:
+        generate_thumbnails(os.path.join(UPLOAD_FOLDER, filename))
+
+    # Features of the processed image when there is one, else of the upload
+    features = get_features(image_hash)
+    category = classify_features(features)[0]
+
+    # The classifier's mean item color (BGR) becomes the primary color
+    blue, green, red = (int(round(value)) for value in features[6:9])
+    color_info = {
+        "name": None,
+        "primary": f"#{red:02x}{green:02x}{blue:02x}",
+        "secondary": None,
+        "section": section
+    }
+
+    return {
+        "name": item_name(member or path),
+        "category": category,
+        "color": json.dumps(color_info),
+        "occasion": [],
+        "filename": filename,
+        "section": section,
+        "content_hash": image_hash,
+        "phash": image_phash,
+        "image_size": image_size
+    }
+
+def _write_batches(batches, totals):
+    """Database writer stage: commit each batch of rows in one transaction"""
+    while True:
+        batch = batches.get()
+        if batch is None:
+            return
+        try:
+            save_clothing_items_bulk(batch)
+            totals["imported"] += len(batch)
+            print(f"Imported {totals['imported']} items")
+        except Exception as e:
+            totals["failed"] += len(batch)
+            print(f"Error saving a batch of {len(batch)} items: {str(e)}")
+
+def import_wardrobe(path, remove_backgrounds=False, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                    section=DEFAULT_SECTION):
+    """
+    Import every image in a directory or zip archive
+
+    Images flow through a bounded pipeline: a process pool decodes, stores,
+    (optionally) removes the background, classifies and thumbnails them,
+    while a writer thread commits the resulting rows in batches. Images
+    already in the wardrobe (same content hash) are skipped by the workers
+    right after decoding.
+
+    Args:
+        path (str): Directory or zip archive of images
+        remove_backgrounds (bool): Run background removal on every image
+        workers (int, optional): Worker processes (default: one per CPU core)
+        batch_size (int): Rows committed per transaction
+        section (str): Wardrobe section of the imported items
+
+    Returns:
+        dict: Number of items imported, skipped as duplicates and failed
+    """
+    run_migrations()
+    sources = iter_sources(path)
+    known_hashes = get_item_content_hashes()
+    workers = workers or os.cpu_count() or 1
+    totals = {"imported": 0, "skipped": 0, "failed": 0}
+    print(f"Importing {len(sources)} images with {workers} workers")
+
+    batches = queue.Queue(maxsize=MAX_PENDING_BATCHES)
+    writer = threading.Thread(target=_write_batches, args=(batches, totals), name="import-writer")
+    writer.start()
+
+    batch = []
+    pending = {}
+    source_iter = iter(sources)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(frozenset(known_hashes),)) as executor:
+            while True:
+                # Keep a bounded number of images in flight
+                while len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                    source = next(source_iter, None)
+                    if source is None:
+                        break
+                    future = executor.submit(_process_image, *source, remove_backgrounds, section)
+                    pending[future] = source
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_path, member = pending.pop(future)
+                    try:
+                        item = future.result()
+                    except Exception as e:
+                        totals["failed"] += 1
+                        print(f"Error importing {member or source_path}: {str(e)}")
+                        continue
+
+                    # Images seen earlier in this import are only caught here
+                    if item is None or item["content_hash"] in known_hashes:
+                        totals["skipped"] += 1
+                        continue
+                    known_hashes.add(item["content_hash"])
+
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        batches.put(batch)
+                        batch = []
+    finally:
+        if batch:
+            batches.put(batch)
+        batches.put(None)
+        writer.join()
+
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a folder or zip archive of clothing photos into the wardrobe")
+    parser.add_argument("path", help="Directory or zip archive of images")
+    parser.add_argument("--remove-background", action="store_true", help="Remove the background of every image")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU core)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows committed per transaction")
+    parser.add_argument("--section", default=DEFAULT_SECTION, help="Wardrobe section of the imported items")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Not found: {args.path}")
+        return 1
+
+    totals = import_wardrobe(args.path, args.remove_background, args.workers, args.batch_size, args.section)
+    print(f"Done: {totals['imported']} imported, {totals['skipped']} already in the wardrobe, "
+          f"{totals['failed']} failed")
+    return 0 if totals["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import json
+import time
+import threading
+from datetime import datetime
+from cache import bump_version
+from db_pool import execute
+from database import (DB_ERRORS, db_connection, backfill_clothing_items, init_background_job_attempts, init_phash_index,
+                      init_wardrobe_stats)
+from search_index import init_search
+
+# Themes seeded into a new database
+DEFAULT_THEMES = [
+    ('Casual', 'Everyday comfortable outfits', ['Top', 'Bottom', 'Casual wear', 'Footwear']),
+    ('Formal', 'Professional and elegant outfits', ['Formal wear', 'Top', 'Bottom', 'Footwear']),
+    ('Party', 'Stylish and trendy outfits for parties', ['Dress', 'Top', 'Bottom', 'Accessory']),
+    ('Traditional', 'Cultural and traditional outfits', ['Ethnic wear', 'Accessory', 'Footwear']),
+    ('Summer', 'Light and breezy outfits for hot weather', ['Top', 'Bottom', 'Casual wear', 'Footwear']),
+    ('Winter', 'Warm and cozy outfits for cold weather', ['Top', 'Bottom', 'Casual wear', 'Footwear'])
+]
+
+def create_baseline_schema():
+    """
+    Create the tables, typed item columns and indexes of schema version 1
+
+    This DDL is frozen: databases that already ran migration 1 never run it
+    again, so editing it would make new and existing databases drift apart.
+    Schema changes go in a new numbered migration instead.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS clothing_items (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            color TEXT,
+            occasion TEXT,
+            filename TEXT NOT NULL,
+            date_added TEXT NOT NULL
+        )
+        ''')
+
+        # Typed columns added on top of the original clothing_items table
+        execute(cursor, 'SELECT * FROM clothing_items LIMIT 0')
+        existing_columns = {column[0] for column in cursor.description}
+        for column, column_type in [('section', 'TEXT'), ('color_name', 'TEXT'), ('primary_color', 'TEXT'),
+                                    ('secondary_color', 'TEXT'), ('brand', 'TEXT'), ('added_at', 'TIMESTAMP'),
+                                    ('content_hash', 'TEXT'), ('phash', 'TEXT'), ('image_width', 'INTEGER'),
+                                    ('image_height', 'INTEGER')]:
+            if column not in existing_columns:
+                execute(cursor, f'ALTER TABLE clothing_items ADD COLUMN {column} {column_type}')
+
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS clothing_item_seasons (
+            item_id INTEGER NOT NULL REFERENCES clothing_items(id) ON DELETE CASCADE,
+            season TEXT NOT NULL,
+            PRIMARY KEY (item_id, season)
+        )
+        ''')
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS clothing_item_occasions (
+            item_id INTEGER NOT NULL REFERENCES clothing_items(id) ON DELETE CASCADE,
+            occasion TEXT NOT NULL,
+            PRIMARY KEY (item_id, occasion)
+        )
+        ''')
+
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_category ON clothing_items (category)')
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_section ON clothing_items (section)')
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_added_at ON clothing_items (added_at)')
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_content_hash ON clothing_items (content_hash)')
+        # Composite indexes matching the sort orders of query_clothing_items
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_added_at_id ON clothing_items (added_at, id)')
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_name_id ON clothing_items (LOWER(name), id)')
+        execute(cursor,
+            'CREATE INDEX IF NOT EXISTS idx_clothing_items_category_added_at ON clothing_items (category, added_at, id)')
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_item_seasons_season ON clothing_item_seasons (season)')
+        execute(cursor,
+            'CREATE INDEX IF NOT EXISTS idx_clothing_item_occasions_occasion ON clothing_item_occasions (occasion)')
+
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS themes (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            categories TEXT NOT NULL
+        )
+        ''')
+
+        # Version counters that tell every app process when cached data changed
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+        ''')
+
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS outfit_feedback (
+            id SERIAL PRIMARY KEY,
+            outfit_items TEXT NOT NULL,
+            theme TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            feedback_text TEXT,
+            date_added TEXT NOT NULL
+        )
+        ''')
+
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS background_jobs (
+            id SERIAL PRIMARY KEY,
+            filename TEXT NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )
+        ''')
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_background_jobs_status ON background_jobs (status, id)')
+
+        execute(cursor, 'SELECT COUNT(*) FROM themes')
+        if cursor.fetchone()[0] == 0:
+            for name, description, categories in DEFAULT_THEMES:
+                execute(cursor,
+                    'INSERT INTO themes (name, description, categories) VALUES (%s, %s, %s)',
+                    (name, description, json.dumps(categories))
+                )
+            bump_version(cursor, "themes")
+
+# Schema migrations in the order they are applied. Each one is idempotent,
+# so a migration interrupted before it was recorded can simply run again.
+# Applied migrations must never be edited: every schema change is a new
+# entry with the next version number.
+MIGRATIONS = [
+    (1, "Create tables, typed item columns and indexes", create_baseline_schema),
+    (2, "Backfill typed columns of items saved with the JSON-only schema", backfill_clothing_items),
+    (3, "Create PostgreSQL full-text and trigram search indexes", init_search),
+    (4, "Create and populate the wardrobe_stats table", init_wardrobe_stats),
+    (5, "Index perceptual hash bands for near-duplicate lookups", init_phash_index),
+    (6, "Count the attempts of background removal jobs", init_background_job_attempts)
+]
+
+_schema_version = None
+_migrate_lock = threading.Lock()
+
+def get_schema_version():
+    """
+    Get the highest migration version recorded in the database
+
+    Returns:
+        int: Schema version (0 for a database no migration has run on)
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, '''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+        ''')
+        execute(cursor, 'SELECT MAX(version) FROM schema_migrations')
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+def run_migrations():
+    """
+    Bring the database schema up to date, once per process
+
+    Pending migrations are applied in order and recorded in the
+    schema_migrations table. Schema changes must be added to MIGRATIONS as
+    new numbered migrations, never by editing one that has been applied.
+
+    After the first call in a process this returns immediately, so Streamlit
+    script reruns cost nothing.
+
+    Returns:
+        int: Schema version of the database
+    """
+    global _schema_version
+    if _schema_version is not None:
+        return _schema_version
+
+    with _migrate_lock:
+        if _schema_version is not None:
+            return _schema_version
+
+        start = time.perf_counter()
+        version = get_schema_version()
+        for migration_version, description, migrate in MIGRATIONS:
+            if migration_version <= version:
+                continue
+
+            step_start = time.perf_counter()
+            migrate()
+            try:
+                with db_connection() as conn:
+                    execute(conn.cursor(),
+                        '''INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)
+                        ON CONFLICT (version) DO NOTHING''',
+                        (migration_version, description, datetime.now())
+                    )
+            except DB_ERRORS as e:
+                # Another process may be migrating at the same time
+                print(f"Error recording migration {migration_version}: {e}")
+            version = migration_version
+            print(f"Applied migration {migration_version} ({description}) "
+                  f"in {(time.perf_counter() - step_start) * 1000:.1f} ms")
+
+        print(f"Database schema at version {version}, checked in {(time.perf_counter() - start) * 1000:.1f} ms")
+        _schema_version = version
+        return version
@@ -1,99 +1,159 @@
-import random
-import json
-from database import get_clothing_items, get_clothing_by_category, get_theme_categories, get_top_rated_outfits, get_outfit_feedback
+from bisect import bisect_right
+from itertools import combinations
+import numpy as np
+from wardrobe_index import get_wardrobe_index
+from outfit_scoring import get_outfit_scores
+from color_harmony import get_color_harmony
 
-def generate_outfit_recommendation(theme, num_recommendations=3, use_feedback=True):
+# Categories each theme draws from
+THEME_CATEGORIES = {
+    "Casual": ["Top", "Bottom", "Casual wear", "Footwear"],
+    "Formal": ["Formal wear", "Top", "Bottom", "Footwear"],
+    "Party": ["Dress", "Accessory"],
+    "Traditional": ["Ethnic wear", "Accessory", "Footwear"],
+    "Summer": ["Top", "Bottom", "Casual wear"],
+    "Winter": ["Top", "Bottom", "Casual wear"]
+}
+
+# Party outfits fall back to separates when the wardrobe has no dresses
+PARTY_FALLBACK_CATEGORIES = ["Top", "Bottom", "Accessory"]
+
+# Default to a simple outfit for unknown themes
+DEFAULT_CATEGORIES = ["Top", "Bottom"]
+
+# Outfits picked by the feedback scores; the rest are sampled uniformly
+SCORED_OUTFITS = 5
+
+# Outfit spaces up to this size are shuffled up front; larger ones are sampled with rejection
+ENUMERATION_LIMIT = 100000
+
+# Sampled outfits are the best by color harmony out of this many candidates per
+# outfit, with at most MAX_EXTRA_CANDIDATES extra candidates in total
+HARMONY_CANDIDATES_PER_OUTFIT = 4
+MAX_EXTRA_CANDIDATES = 400
+
+def outfit_categories(available_categories):
+    """
+    Split the categories of an outfit into the ones it must have and the ones it may have
+    
+    Args:
+        available_categories (list): Theme categories that have items in the wardrobe
+        
+    Returns:
+        tuple: (required categories, optional categories)
+    """
+    # Dress-based outfits, optionally with accessories and footwear
+    if "Dress" in available_categories:
+        return ["Dress"], [cat for cat in ["Accessory", "Footwear"] if cat in available_categories]
+    
+    # Ethnic wear, optionally with accessories and footwear
+    if "Ethnic wear" in available_categories:
+        return ["Ethnic wear"], [cat for cat in ["Accessory", "Footwear"] if cat in available_categories]
+    
+    # Standard top and bottom outfit with any other available category
+    core = [cat for cat in ["Top", "Bottom"] if cat in available_categories]
+    return core, [cat for cat in available_categories if cat not in ["Top", "Bottom"]]
+
+def iter_outfits(slots, optional, rng, min_items=2):
+    """
+    Lazily yield distinct random outfits
+    
+    Every valid combination of categories (all required slots plus any
+    subset of the optional ones, with at least min_items items) is
+    enumerated, and item tuples are drawn from their union uniformly and
+    without replacement, until the space is exhausted.
+    
+    Args:
+        slots (list): One list of candidate item IDs per category
+        optional (list): Whether each slot may be left out
+        rng (numpy.random.Generator): Random number generator (seed it for repeatable results)
+        min_items (int): Minimum number of items in an outfit
+        
+    Yields:
+        list: Outfit item IDs, in slot order
+    """
+    required = [i for i, is_optional in enumerate(optional) if not is_optional]
+    optional_slots = [i for i, is_optional in enumerate(optional) if is_optional]
+    
+    # Category combinations with the number of outfits each one allows
+    category_sets = []
+    offsets = []
+    total = 0
+    for count in range(len(optional_slots) + 1):
+        for extra in combinations(optional_slots, count):
+            chosen = sorted(required + list(extra))
+            size = 1
+            for i in chosen:
+                size *= len(slots[i])
+            if len(chosen) < min_items or size == 0:
+                continue
+            category_sets.append(chosen)
+            offsets.append(total)
+            total += size
+    if total == 0:
+        return
+    
+    def decode(index):
+        position = bisect_right(offsets, index) - 1
+        index -= offsets[position]
+        outfit = []
+        # Mixed radix digits of the index pick one item per slot
+        for i in reversed(category_sets[position]):
+            index, digit = divmod(index, len(slots[i]))
+            outfit.append(slots[i][digit])
+        return outfit[::-1]
+    
+    if total <= ENUMERATION_LIMIT:
+        for index in rng.permutation(total):
+            yield decode(int(index))
+        return
+    
+    # Huge spaces: collisions are rare, so draw and skip repeats
+    drawn = set()
+    while len(drawn) < total:
+        index = int(rng.integers(total))
+        if index not in drawn:
+            drawn.add(index)
+            yield decode(index)
+
+def generate_outfit_recommendation(theme, num_recommendations=3, use_feedback=True, seed=None):
     """
     Generate outfit recommendations based on the selected theme
     
+    The first outfits are picked by a top-k search over the item-pair and
+    item-theme scores learned from outfit feedback; the rest are distinct
+    outfits sampled without replacement and ranked by color harmony, so as
+    many outfits as the wardrobe allows are returned.
+    
     Args:
         theme (str): The selected theme
         num_recommendations (int): Number of outfit recommendations to generate
         use_feedback (bool): Whether to use previous user feedback to improve recommendations
+        seed (int, optional): Random seed, for repeatable recommendations
         
     Returns:
         list: List of outfits, where each outfit is a list of clothing item IDs
     """
-def get_theme_categories(theme):
-    theme_map = {
-        "casual": ["jeans", "t-shirt", "sneakers"],
-        "formal": ["blazer", "slacks", "dress shoes"],
-        "sporty": ["tracksuit", "running shoes"],
-        # Add more themes as needed
-    }
-    return theme_map.get(theme, [])
-
-    # Get all clothing items
-    all_items = get_clothing_items()
+    # Determine which categories we need for this theme
+    required_categories = THEME_CATEGORIES.get(theme, DEFAULT_CATEGORIES)
+    fetch_categories = list(required_categories)
+    if theme == "Party":
+        fetch_categories += PARTY_FALLBACK_CATEGORIES
+    
+    # Look up the items of every category we may use in the wardrobe index
+    wardrobe = get_wardrobe_index()
+    items_by_category = {}
+    for category in dict.fromkeys(fetch_categories):
+        category_items = wardrobe.find(category=category)
+        if category_items:
+            items_by_category[category] = category_items
     
     # If no items, return empty list
-    if not all_items:
+    if not items_by_category:
         return []
     
-    # Get appropriate categories for the theme
-    theme_categories = get_theme_categories(theme)
-    
-    # Create a dictionary of items by category
-    items_by_category = {}
-    item_id_map = {}  # Map item IDs to full items for later lookup
-    
-    for item in all_items:
-        item_id = item[0]  # ID is at index 0
-        category = item[2]  # Category is at index 2
-        if category not in items_by_category:
-            items_by_category[category] = []
-        items_by_category[category].append(item)
-        item_id_map[item_id] = item
-    
-    # If using feedback, first try to get highly rated outfits for this theme
-    recommended_outfits = []
-    if use_feedback:
-        top_rated = get_top_rated_outfits(theme, limit=3)
-        
-        # If we found some top-rated outfits, include them
-        if top_rated and len(top_rated) > 0:
-            for feedback in top_rated:
-                try:
-                    outfit_items_json = feedback[1]  # outfit_items is at index 1
-                    outfit_items_list = json.loads(outfit_items_json)
-                    
-                    # Convert IDs back to categories for our algorithm
-                    outfit_categories = []
-                    for item_id in outfit_items_list:
-                        if str(item_id).isdigit() and int(item_id) in item_id_map:
-                            outfit_categories.append(item_id_map[int(item_id)][2])  # Category at index 2
-                    
-                    if outfit_categories:
-                        recommended_outfits.append(outfit_categories)
-                except (json.JSONDecodeError, IndexError, KeyError) as e:
-                    # Skip this feedback if there's an error
-                    print(f"Error processing feedback: {e}")
-                    continue
-    
-    # Create outfits based on theme categories
-    outfits = []
-    
-    # Determine which categories we need for this theme
-    required_categories = []
-    
-    if theme == "Casual":
-        required_categories = ["Top", "Bottom", "Casual wear", "Footwear"]
-    elif theme == "Formal":
-        required_categories = ["Formal wear", "Top", "Bottom", "Footwear"]
-    elif theme == "Party":
-        required_categories = ["Dress", "Accessory"]
-        # Alternatively, use top and bottom
-        if "Dress" not in items_by_category or len(items_by_category.get("Dress", [])) == 0:
-            required_categories = ["Top", "Bottom", "Accessory"]
-    elif theme == "Traditional":
-        required_categories = ["Ethnic wear", "Accessory", "Footwear"]
-    elif theme == "Summer":
-        required_categories = ["Top", "Bottom", "Casual wear"]
-    elif theme == "Winter":
-        required_categories = ["Top", "Bottom", "Casual wear"]
-    else:
-        # Default to a simple outfit
-        required_categories = ["Top", "Bottom"]
+    if theme == "Party" and not items_by_category.get("Dress"):
+        required_categories = PARTY_FALLBACK_CATEGORIES
     
     # Filter to only include categories with available items
     available_categories = [cat for cat in required_categories if cat in items_by_category and items_by_category[cat]]
@@ -102,66 +162,31 @@ def get_theme_categories(theme):
     if len(available_categories) < 2:
         return []
     
-    # Generate the requested number of outfit recommendations
-    attempts = 0
-    while len(outfits) < num_recommendations and attempts < 20:
-        attempts += 1
-        outfit = []
-        
-        # Handle special case for dress-based outfits
-        if "Dress" in available_categories:
-            # Add a random dress
-            dress = random.choice(items_by_category["Dress"])
-            outfit.append("Dress")
-            
-            # Potentially add accessories or footwear if available
-            if "Accessory" in available_categories and random.random() > 0.5:
-                outfit.append("Accessory")
-            if "Footwear" in available_categories and random.random() > 0.3:
-                outfit.append("Footwear")
-        
-        # Handle special case for ethnic wear
-        elif "Ethnic wear" in available_categories:
-            # Add ethnic wear
-            outfit.append("Ethnic wear")
-            
-            # Add accessories and footwear if available
-            if "Accessory" in available_categories and random.random() > 0.3:
-                outfit.append("Accessory")
-            if "Footwear" in available_categories and random.random() > 0.3:
-                outfit.append("Footwear")
-        
-        # Standard top and bottom outfit
-        else:
-            # Always include top and bottom if available
-            if "Top" in available_categories:
-                outfit.append("Top")
-            if "Bottom" in available_categories:
-                outfit.append("Bottom")
-            
-            # Randomly add other available categories
-            for category in available_categories:
-                if category not in ["Top", "Bottom"] and random.random() > 0.5:
-                    outfit.append(category)
-        
-        # Ensure we have at least 2 items
-        if len(outfit) < 2:
-            continue
-        
-        # Convert category names to actual item IDs
-        outfit_items = []
-        for category in outfit:
-            # Get a random item from this category
-            if category in items_by_category and items_by_category[category]:
-                item = random.choice(items_by_category[category])
-                outfit_items.append(category)
-        
-        # Add this outfit if it's unique
-        if outfit_items and outfit_items not in outfits:
-            outfits.append(outfit_items)
+    core_categories, optional_categories = outfit_categories(available_categories)
+    slots = [[item[0] for item in items_by_category[category]]  # ID is at index 0
+             for category in core_categories + optional_categories]
+    optional = [False] * len(core_categories) + [True] * len(optional_categories)
+    
+    rng = np.random.default_rng(seed)
+    outfits = []
+    if use_feedback:
+        scores = get_outfit_scores()
+        # Without any feedback every outfit scores the same, so just sample
+        if scores.has_feedback():
+            outfits = scores.top_outfits(theme, slots, min(num_recommendations, SCORED_OUTFITS),
+                                         optional=optional, rng=rng)
     
-    # Combine the highly rated outfits from feedback with the new generated outfits
-    combined_outfits = recommended_outfits + outfits
+    # Draw a pool of distinct candidates and keep the most color-harmonious ones
+    remaining = num_recommendations - len(outfits)
+    pool_size = min(remaining * HARMONY_CANDIDATES_PER_OUTFIT, remaining + MAX_EXTRA_CANDIDATES)
+    seen = {tuple(outfit) for outfit in outfits}
+    candidates = []
+    for outfit in iter_outfits(slots, optional, rng):
+        if len(candidates) >= pool_size:
+            break
+        if tuple(outfit) not in seen:
+            seen.add(tuple(outfit))
+            candidates.append(outfit)
     
-    # Return only the requested number of outfits
-    return combined_outfits[:num_recommendations]
+    outfits += get_color_harmony().rank_outfits(candidates)[:max(remaining, 0)]
+    return outfits
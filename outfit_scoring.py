@@ -0,0 +1,226 @@
+import threading
+from itertools import combinations
+import numpy as np
+from cache import VersionWatch
+from database import get_outfit_feedback, parse_outfit_items, register_feedback_listener
+
+# Ratings above this count in favour of an item combination, ratings below it against
+NEUTRAL_RATING = 3
+
+# Pseudo-count of neutral ratings every score starts with, so a single
+# rating does not outweigh many consistent ones
+PRIOR_WEIGHT = 1.0
+
+# Scale of the random jitter added to candidate scores so that items
+# without feedback are explored instead of always picked in the same order
+EXPLORATION_NOISE = 0.1
+
+# Candidate item ID standing for "leave this optional category out"
+SKIP_ITEM = -1
+
+class OutfitScores:
+    """
+    Item-pair and item-theme compatibility scores learned from outfit feedback
+
+    Every rating adds (rating - NEUTRAL_RATING) to each pair of items in the
+    outfit and to each item's score for the theme. Totals and counts are
+    kept only for the pairs that were actually rated together, which stays
+    proportional to the feedback instead of the square of the wardrobe, and
+    are updated in place for every new feedback record, so generating
+    outfits never rescans the feedback table.
+
+    Scores are smoothed means computed when they are read: a beam search
+    only looks up the pairs between its partial outfits and the next
+    category's candidates. Items without feedback score zero.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.pairs = {}           # (smaller item_id, larger item_id) -> [total, count]
+        self.neighbors = {}       # item_id -> set of item IDs it was rated with
+        self.themes = {}          # theme -> {item_id: [total, count]}
+
+    def load(self, feedback=None):
+        """
+        (Re)build the scores from the outfit_feedback table
+
+        Args:
+            feedback (list, optional): Feedback records to use instead of querying the database
+        """
+        if feedback is None:
+            feedback = get_outfit_feedback()
+
+        with self._lock:
+            self._reset()
+            for record in feedback:
+                # (id, outfit_items, theme, rating, feedback_text, date_added)
+                self.add_feedback(parse_outfit_items(record[1]), record[2], record[3])
+
+    def add_feedback(self, item_ids, theme, rating):
+        """
+        Update the scores with one rated outfit
+
+        Args:
+            item_ids (list): IDs of the items in the outfit
+            theme (str): Theme the outfit was recommended for
+            rating (int): User rating (1-5)
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        if not item_ids:
+            return
+
+        with self._lock:
+            weight = float(rating) - NEUTRAL_RATING
+            for pair in combinations(sorted(item_ids), 2):
+                stats = self.pairs.setdefault(pair, [0.0, 0])
+                stats[0] += weight
+                stats[1] += 1
+                self.neighbors.setdefault(pair[0], set()).add(pair[1])
+                self.neighbors.setdefault(pair[1], set()).add(pair[0])
+
+            theme_stats = self.themes.setdefault(theme, {})
+            for item_id in item_ids:
+                stats = theme_stats.setdefault(item_id, [0.0, 0])
+                stats[0] += weight
+                stats[1] += 1
+
+    def has_feedback(self):
+        """Whether any feedback has been recorded"""
+        return bool(self.themes)
+
+    @staticmethod
+    def _mean(stats):
+        """Smoothed mean of a [total, count] entry (0 for a missing one)"""
+        return stats[0] / (stats[1] + PRIOR_WEIGHT) if stats else 0.0
+
+    def _pair_score(self, item_a, item_b):
+        return self._mean(self.pairs.get((item_a, item_b) if item_a < item_b else (item_b, item_a)))
+
+    def _pair_block(self, members, columns, width):
+        """
+        Pair scores between beam members and the candidates of a slot
+
+        Args:
+            members (list): Item IDs in the current beams
+            columns (dict): Candidate item ID -> column
+            width (int): Number of columns
+
+        Returns:
+            numpy.ndarray: Array of shape (len(members), width)
+        """
+        block = np.zeros((len(members), width))
+        for row, item_id in enumerate(members):
+            linked = self.neighbors.get(item_id)
+            if not linked:
+                continue
+            # Walk whichever side is smaller: the item's rated partners or the candidates
+            for other_id in (linked if len(linked) < len(columns) else columns):
+                if other_id in linked and other_id in columns:
+                    block[row, columns[other_id]] = self._pair_score(item_id, other_id)
+        return block
+
+    def score_outfit(self, item_ids, theme):
+        """Compatibility score of an outfit for a theme (0 without any feedback)"""
+        with self._lock:
+            score = sum(self._pair_score(item_a, item_b) for item_a, item_b in combinations(dict.fromkeys(item_ids), 2))
+            theme_stats = self.themes.get(theme, {})
+            score += sum(self._mean(theme_stats.get(item_id)) for item_id in item_ids)
+            return float(score)
+
+    def _beam_search(self, theme, slots, optional, beam_width, rng, noise):
+        """Run one beam search and return the final (item IDs, scores) beams"""
+        theme_stats = self.themes.get(theme, {})
+
+        beam_ids = np.zeros((1, 0), dtype=np.int64)
+        beam_scores = np.zeros(1)
+        for candidates, is_optional in zip(slots, optional):
+            ids = np.array(list(candidates) + ([SKIP_ITEM] if is_optional else []), dtype=np.int64)
+            if len(ids) == 0:
+                continue
+            id_list = ids.tolist()
+
+            item_scores = np.array([self._mean(theme_stats.get(item_id)) for item_id in id_list])
+            if noise:
+                item_scores = item_scores + noise * rng.random(len(ids))
+            # Score of each candidate against every item already in each beam,
+            # looked up once per distinct item in the beams
+            members, member_rows = np.unique(beam_ids, return_inverse=True)
+            block = self._pair_block(members.tolist(), {item_id: column for column, item_id in enumerate(id_list)},
+                                     len(ids))
+            pair_scores = block[member_rows.reshape(beam_ids.shape)].sum(axis=1)
+            totals = beam_scores[:, None] + item_scores[None, :] + pair_scores
+
+            flat = totals.ravel()
+            keep = min(beam_width, flat.size)
+            best = np.argpartition(-flat, keep - 1)[:keep]
+            beam_index, candidate_index = np.divmod(best, len(ids))
+            beam_ids = np.column_stack([beam_ids[beam_index], ids[candidate_index]])
+            beam_scores = flat[best]
+
+        order = np.argsort(-beam_scores, kind="stable")
+        return beam_ids[order], beam_scores[order]
+
+    def top_outfits(self, theme, slots, k, optional=None, min_items=2, beam_width=16, rng=None,
+                    noise=EXPLORATION_NOISE):
+        """
+        Find the best scoring outfits with beam searches over the category slots
+
+        Each outfit comes from a fresh search with new exploration jitter, so
+        the results are not all small variations of the single best outfit;
+        outfits found by an earlier search are not returned twice.
+
+        Args:
+            theme (str): Theme to score the outfits for
+            slots (list): One list of candidate item IDs per category
+            k (int): Number of outfits to return
+            optional (list, optional): Whether each slot may be left empty (default: none)
+            min_items (int): Minimum number of items in an outfit
+            beam_width (int): Partial outfits kept after each slot
+            rng (numpy.random.Generator, optional): Source of the exploration jitter
+            noise (float): Scale of the exploration jitter
+
+        Returns:
+            list: Up to k outfits (lists of item IDs), best first
+        """
+        optional = optional or [False] * len(slots)
+        rng = rng if rng is not None else np.random.default_rng()
+
+        outfits = []
+        seen = set()
+        with self._lock:
+            for _ in range(k):
+                beam_ids, _ = self._beam_search(theme, slots, optional, beam_width, rng, noise)
+                for beam in beam_ids:
+                    outfit = [int(item_id) for item_id in beam if item_id != SKIP_ITEM]
+                    if len(outfit) >= min_items and tuple(outfit) not in seen:
+                        seen.add(tuple(outfit))
+                        outfits.append(outfit)
+                        break
+        return outfits
+
+_scores = None
+_scores_watch = None
+_scores_lock = threading.Lock()
+
+def get_outfit_scores():
+    """
+    Get the process-wide outfit scores, loading them from the feedback table on first use
+
+    Reloaded when another process saves feedback (see cache.VersionWatch).
+    """
+    global _scores, _scores_watch
+    if _scores is None:
+        with _scores_lock:
+            if _scores is None:
+                scores = OutfitScores()
+                _scores_watch = VersionWatch("outfit_feedback")
+                _scores_watch.sync()
+                scores.load()
+                register_feedback_listener(scores.add_feedback)
+                _scores = scores
+    elif _scores_watch.changed():
+        _scores.load()
+    return _scores
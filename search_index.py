@@ -0,0 +1,327 @@
+import re
+import heapq
+import threading
+from cache import VersionWatch
+from db_pool import execute
+from database import (DB_ERRORS, DEFAULT_SECTION, ITEM_COLUMNS, db_connection, get_clothing_items, get_pool,
+                      item_filters, parse_color_info, register_item_delete_listener, register_item_listener)
+
+# Relative weight of each searchable field
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "category": 2.0,
+    "color": 1.0,
+    "brand": 1.0
+}
+
+# Minimum trigram similarity for a word to count as a fuzzy match
+SIMILARITY_THRESHOLD = 0.3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric words"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+def trigrams(token):
+    """Get the trigrams of a word, padded the same way as pg_trgm"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def item_fields(item):
+    """
+    Get the searchable text fields of a clothing item record
+
+    Only the human readable color name and brand are indexed, never the keys
+    of the color JSON.
+    """
+    color_info = parse_color_info(item[3])
+    return {
+        "name": item[1],
+        "category": item[2],
+        "color": color_info["name"],
+        "brand": color_info["brand"]
+    }
+
+class SearchIndex:
+    """
+    In-process inverted index for wardrobe search
+
+    Maps words to the items containing them (with field weights) and
+    trigrams to words, so queries are answered with exact, prefix and
+    fuzzy (trigram similarity) matches without scanning the wardrobe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = {}     # word -> {item_id: weight}
+        self.vocabulary = {}   # trigram -> set of words
+        self.trigram_counts = {}  # word -> number of trigrams
+        self.item_words = {}   # item_id -> set of words
+        self.items = {}        # item_id -> clothing item record
+        self.by_category = {}  # category -> set of item_ids
+        self.by_section = {}   # section -> set of item_ids
+
+    def load(self, items=None):
+        """
+        (Re)build the index
+
+        Args:
+            items (list, optional): Clothing item records to index instead of querying the database
+        """
+        if items is None:
+            items = get_clothing_items()
+
+        with self._lock:
+            self.postings = {}
+            self.vocabulary = {}
+            self.trigram_counts = {}
+            self.item_words = {}
+            self.items = {}
+            self.by_category = {}
+            self.by_section = {}
+            for item in items:
+                self.add_item(item)
+
+    def add_item(self, item):
+        """Add or replace a single clothing item record"""
+        with self._lock:
+            item_id = item[0]
+            if item_id in self.items:
+                self.remove_item(item_id)
+
+            weights = {}
+            for field, text in item_fields(item).items():
+                for word in tokenize(text):
+                    weights[word] = max(weights.get(word, 0.0), FIELD_WEIGHTS[field])
+
+            self.items[item_id] = item
+            self.item_words[item_id] = set(weights)
+            self.by_category.setdefault(item[2], set()).add(item_id)
+            self.by_section.setdefault(parse_color_info(item[3])["section"] or DEFAULT_SECTION, set()).add(item_id)
+            for word, weight in weights.items():
+                if word not in self.postings:
+                    self.postings[word] = {}
+                    word_trigrams = trigrams(word)
+                    self.trigram_counts[word] = len(word_trigrams)
+                    for trigram in word_trigrams:
+                        self.vocabulary.setdefault(trigram, set()).add(word)
+                self.postings[word][item_id] = weight
+
+    def remove_item(self, item_id):
+        """Remove a clothing item from the index"""
+        with self._lock:
+            item = self.items.pop(item_id, None)
+            if item is not None:
+                for postings, key in ((self.by_category, item[2]),
+                                      (self.by_section, parse_color_info(item[3])["section"] or DEFAULT_SECTION)):
+                    ids = postings.get(key)
+                    if ids is not None:
+                        ids.discard(item_id)
+                        if not ids:
+                            del postings[key]
+            for word in self.item_words.pop(item_id, set()):
+                postings = self.postings.get(word)
+                if postings is None:
+                    continue
+                postings.pop(item_id, None)
+                if not postings:
+                    del self.postings[word]
+                    del self.trigram_counts[word]
+                    for trigram in trigrams(word):
+                        words = self.vocabulary.get(trigram)
+                        if words is not None:
+                            words.discard(word)
+                            if not words:
+                                del self.vocabulary[trigram]
+
+    def _matching_words(self, token):
+        """Get the indexed words matching a query word, with their similarity"""
+        query_trigrams = trigrams(token)
+        shared = {}
+        for trigram in query_trigrams:
+            for word in self.vocabulary.get(trigram, ()):
+                shared[word] = shared.get(word, 0) + 1
+
+        matches = {}
+        for word, count in shared.items():
+            if word == token:
+                similarity = 1.0
+            else:
+                similarity = count / (len(query_trigrams) + self.trigram_counts[word] - count)
+                if word.startswith(token):
+                    # Prefix matches keep search-as-you-type useful
+                    similarity = max(similarity, 0.75)
+            if similarity >= SIMILARITY_THRESHOLD:
+                matches[word] = similarity
+        return matches
+
+    def search(self, query, limit=50, category=None, section=None):
+        """
+        Find the items matching every word of the query, best matches first
+
+        Args:
+            query (str): Search text
+            limit (int): Maximum number of items to return
+            category (str, optional): Only return items of this category
+            section (str, optional): Only return items of this section
+
+        Returns:
+            list: Matching clothing item records
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            # Restrict to the filtered items before ranking, so the limit applies to matches only
+            allowed = None
+            for postings, key in ((self.by_category, category), (self.by_section, section)):
+                if key is not None:
+                    ids = postings.get(key, set())
+                    allowed = ids if allowed is None else allowed & ids
+            if allowed is not None and not allowed:
+                return []
+
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for word, similarity in self._matching_words(token).items():
+                    for item_id, weight in self.postings[word].items():
+                        if allowed is not None and item_id not in allowed:
+                            continue
+                        score = similarity * weight
+                        if score > token_scores.get(item_id, 0.0):
+                            token_scores[item_id] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {item_id: score + token_scores[item_id]
+                              for item_id, score in scores.items() if item_id in token_scores}
+                if not scores:
+                    return []
+
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda entry: (entry[1], entry[0]))
+            return [self.items[item_id] for item_id, _ in ranked]
+
+_index = None
+_index_watch = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """
+    Get the process-wide in-process search index, loading it on first use
+
+    Reloaded when another process changes the clothing items (see cache.VersionWatch).
+    """
+    global _index, _index_watch
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SearchIndex()
+                _index_watch = VersionWatch("clothing_items")
+                _index_watch.sync()
+                index.load()
+                register_item_listener(index.add_item)
+                register_item_delete_listener(index.remove_item)
+                _index = index
+    elif _index_watch.changed():
+        _index.load()
+    return _index
+
+_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(color_name, '') || ' ' || coalesce(brand, '')), 'C')"
+)
+
+_has_trigram = None
+
+def init_search():
+    """
+    Create the PostgreSQL full-text and trigram search indexes
+
+    Adds a generated tsvector column with a GIN index and, when the pg_trgm
+    extension can be enabled, a trigram index on the item name. Does nothing
+    on other backends, which use the in-process SearchIndex instead.
+    """
+    global _has_trigram
+    if get_pool().backend.name != "postgres":
+        return
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        execute(cursor, 'SELECT * FROM clothing_items LIMIT 0')
+        if 'search_vector' not in {column[0] for column in cursor.description}:
+            execute(cursor,
+                f'ALTER TABLE clothing_items ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({_SEARCH_VECTOR}) STORED'
+            )
+        execute(cursor, 'CREATE INDEX IF NOT EXISTS idx_clothing_items_search ON clothing_items USING GIN (search_vector)')
+
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            execute(cursor, 'CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            execute(cursor,
+                'CREATE INDEX IF NOT EXISTS idx_clothing_items_name_trgm ON clothing_items USING GIN (LOWER(name) gin_trgm_ops)'
+            )
+        _has_trigram = True
+    except DB_ERRORS as e:
+        print(f"Trigram search unavailable, using full-text search only: {e}")
+        _has_trigram = False
+
+def _postgres_has_trigram():
+    global _has_trigram
+    if _has_trigram is None:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            execute(cursor, "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _has_trigram = cursor.fetchone() is not None
+    return _has_trigram
+
+def search_clothing_items(query, limit=50, category=None, section=None):
+    """
+    Search the wardrobe by name, category, color name and brand
+
+    Uses the tsvector and trigram indexes on PostgreSQL and the in-process
+    SearchIndex on other backends. The filters are applied before ranking,
+    so the limit only counts items that pass them.
+
+    Args:
+        query (str): Search text
+        limit (int): Maximum number of items to return
+        category (str, optional): Only return items of this category
+        section (str, optional): Only return items of this section
+
+    Returns:
+        list: Matching clothing item records, best matches first
+    """
+    if not tokenize(query):
+        return []
+
+    if get_pool().backend.name != "postgres":
+        return get_search_index().search(query, limit, category, section)
+
+    text = ' '.join(tokenize(query))
+    conditions, params = item_filters(category, section)
+    filters = ''.join(f' AND {condition}' for condition in conditions)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if _postgres_has_trigram():
+            execute(cursor,
+                f'''SELECT {ITEM_COLUMNS} FROM clothing_items
+                WHERE (search_vector @@ plainto_tsquery('simple', %s) OR LOWER(name) %% %s){filters}
+                ORDER BY ts_rank(search_vector, plainto_tsquery('simple', %s)) + similarity(LOWER(name), %s) DESC, id DESC
+                LIMIT %s''',
+                (text, text, *params, text, text, limit)
+            )
+        else:
+            execute(cursor,
+                f'''SELECT {ITEM_COLUMNS} FROM clothing_items
+                WHERE search_vector @@ plainto_tsquery('simple', %s){filters}
+                ORDER BY ts_rank(search_vector, plainto_tsquery('simple', %s)) DESC, id DESC
+                LIMIT %s''',
+                (text, *params, text, limit)
+            )
+        return cursor.fetchall()
@@ -0,0 +1,117 @@
+import os
+import threading
+from PIL import Image, features
+
+# Fixed thumbnail sizes as (max width, max height)
+THUMBNAIL_SIZES = {
+    "grid": (300, 300),      # Wardrobe grid and outfit component cards
+    "canvas": (300, 400),    # Items pasted onto the combined outfit canvas
+    "full": (1200, 1200)     # Detail views
+}
+
+# Thumbnails are written to this folder next to the original image
+THUMBNAIL_FOLDER = "thumbnails"
+
+# WebP keeps transparency at a fraction of the PNG size; fall back to JPEG
+# (flattened on white) if Pillow was built without WebP support
+HAS_WEBP = features.check("webp")
+THUMBNAIL_EXTENSION = "webp" if HAS_WEBP else "jpg"
+
+try:
+    _RESAMPLE = Image.Resampling.LANCZOS
+except AttributeError:
+    _RESAMPLE = Image.LANCZOS
+
+def thumbnail_path(image_path, size):
+    """
+    Get the path of a thumbnail for an image
+
+    Args:
+        image_path (str): Path to the original image
+        size (str): One of the THUMBNAIL_SIZES names
+
+    Returns:
+        str: Path where the thumbnail is stored
+    """
+    folder, filename = os.path.split(image_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(folder, THUMBNAIL_FOLDER, f"{stem}_{size}.{THUMBNAIL_EXTENSION}")
+
+def _save_thumbnail(img, path):
+    # Write to a temporary file first so a concurrent reader never sees a
+    # partial thumbnail; the name is unique per process and thread because
+    # web sessions, workers and imports can all render the same image
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if HAS_WEBP:
+            img.save(temp_path, "WEBP", quality=85, method=4)
+        else:
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            img.convert("RGB").save(temp_path, "JPEG", quality=85, optimize=True)
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def generate_thumbnails(image_path, sizes=None):
+    """
+    Write the fixed-size thumbnails of an image
+
+    The image is decoded once and downscaled from the largest size to the
+    smallest.
+
+    Args:
+        image_path (str): Path to the original image
+        sizes (list, optional): Names of the sizes to generate (default: all)
+
+    Returns:
+        dict: Mapping of size name to thumbnail path
+    """
+    sizes = sizes or list(THUMBNAIL_SIZES)
+    os.makedirs(os.path.join(os.path.dirname(image_path), THUMBNAIL_FOLDER), exist_ok=True)
+
+    paths = {}
+    with Image.open(image_path) as source:
+        largest = max(THUMBNAIL_SIZES[size] for size in sizes)
+        # Let JPEG decode at a reduced scale when possible
+        source.draft("RGB", largest)
+        img = source.convert("RGBA")
+
+    for size in sorted(sizes, key=lambda name: THUMBNAIL_SIZES[name], reverse=True):
+        img.thumbnail(THUMBNAIL_SIZES[size], _RESAMPLE)
+        path = thumbnail_path(image_path, size)
+        _save_thumbnail(img, path)
+        paths[size] = path
+
+    return paths
+
+def get_thumbnail(image_path, size="grid"):
+    """
+    Get the path of an image's thumbnail, creating it if it is missing or stale
+
+    Args:
+        image_path (str): Path to the original image
+        size (str): One of the THUMBNAIL_SIZES names
+
+    Returns:
+        str: Path to the thumbnail, or to the original image if it cannot be created
+    """
+    path = thumbnail_path(image_path, size)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(image_path):
+            return path
+    except OSError:
+        pass
+
+    try:
+        return generate_thumbnails(image_path, [size])[size]
+    except Exception as e:
+        print(f"Error creating thumbnail for {image_path}: {str(e)}")
+        return image_path
@@ -1,8 +1,11 @@
 import os
 import io
-import requests
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-import streamlit as st
 
 # Hardcoded stock photo URLs (would normally be loaded from a database or external API)
 STOCK_PHOTOS = {
@@ -29,10 +32,140 @@ STOCK_PHOTOS = {
     ]
 }
 
-@st.cache_data
+# Stock photos are cached in this folder; copies bundled with the app can be
+# placed here too (named by sample_image_path) for offline use
+SAMPLE_IMAGE_FOLDER = os.environ.get("FASHIONAIST_SAMPLE_FOLDER", "sample_images")
+
+# Serve only the copies on disk and never touch the network
+SAMPLE_OFFLINE = os.environ.get("FASHIONAIST_OFFLINE", "").lower() in ("1", "true", "yes")
+
+# Seconds after which a cached photo is revalidated with the server
+SAMPLE_REVALIDATE_AFTER = 7 * 24 * 3600
+
+# (connect, read) timeouts in seconds and number of concurrent downloads
+SAMPLE_FETCH_TIMEOUT = (3.05, 10)
+SAMPLE_FETCH_WORKERS = 4
+
+_fetching = set()                  # URLs currently being downloaded
+_fetch_lock = threading.Lock()
+_images = {}                       # path -> (mtime, decoded image)
+_images_lock = threading.Lock()
+
+def sample_image_path(url):
+    """
+    Get the path where a stock photo is kept on disk
+
+    Args:
+        url (str): URL of the stock photo
+
+    Returns:
+        str: Path of the cached (or bundled) copy
+    """
+    return os.path.join(SAMPLE_IMAGE_FOLDER, hashlib.sha1(url.encode()).hexdigest()[:16] + ".jpg")
+
+def _read_metadata(path):
+    try:
+        with open(path + ".json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, data):
+    # Write to a temporary file first so readers never see a partial file
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _needs_fetch(url):
+    path = sample_image_path(url)
+    if not os.path.exists(path):
+        return True
+    return time.time() - _read_metadata(path).get("checked_at", 0) > SAMPLE_REVALIDATE_AFTER
+
+def _fetch_sample_image(session, url):
+    """
+    Download a stock photo into the disk cache, revalidating a cached copy
+
+    A cached copy is sent with its ETag and Last-Modified date, so an
+    unchanged photo costs a 304 response instead of a download.
+    """
+    path = sample_image_path(url)
+    metadata = _read_metadata(path) if os.path.exists(path) else {}
+    headers = {}
+    if metadata.get("etag"):
+        headers["If-None-Match"] = metadata["etag"]
+    if metadata.get("last_modified"):
+        headers["If-Modified-Since"] = metadata["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=SAMPLE_FETCH_TIMEOUT)
+        if response.status_code != 304:
+            response.raise_for_status()
+            # Make sure a broken download never replaces a good copy
+            Image.open(io.BytesIO(response.content)).verify()
+            os.makedirs(SAMPLE_IMAGE_FOLDER, exist_ok=True)
+            _write_atomic(path, response.content)
+            metadata = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+        metadata["checked_at"] = time.time()
+        _write_atomic(path + ".json", json.dumps(metadata).encode())
+    except Exception as e:
+        print(f"Error loading image from {url}: {str(e)}")
+    finally:
+        with _fetch_lock:
+            _fetching.discard(url)
+
+def refresh_sample_images(category=None, wait=False):
+    """
+    Download missing stock photos and revalidate stale ones
+
+    Photos are fetched concurrently in background threads. Nothing is
+    fetched in offline mode, and a photo already being fetched is not
+    requested twice.
+
+    Args:
+        category (str, optional): Category to refresh (default: all)
+        wait (bool): Block until the downloads have finished
+
+    Returns:
+        int: Number of photos being fetched
+    """
+    if SAMPLE_OFFLINE:
+        return 0
+
+    categories = [category] if category is not None else list(STOCK_PHOTOS)
+    with _fetch_lock:
+        urls = [url for name in categories for url in STOCK_PHOTOS.get(name, [])
+                if url not in _fetching and _needs_fetch(url)]
+        _fetching.update(urls)
+    if not urls:
+        return 0
+
+    def fetch_all():
+        # requests is only needed once images are actually fetched
+        import requests
+
+        with requests.Session() as session, \
+                ThreadPoolExecutor(max_workers=SAMPLE_FETCH_WORKERS) as executor:
+            list(executor.map(lambda url: _fetch_sample_image(session, url), urls))
+
+    if wait:
+        fetch_all()
+    else:
+        threading.Thread(target=fetch_all, name="sample-image-fetch", daemon=True).start()
+    return len(urls)
+
 def load_sample_images(category):
     """
     Load sample images for display
+
+    Only copies already on disk are returned, so this never waits for the
+    network; missing or stale photos are fetched in the background and
+    show up on a later call.
     
     Args:
         category (str): Category of images to load
@@ -40,16 +173,31 @@ def load_sample_images(category):
     Returns:
         list: List of PIL Image objects
     """
+    refresh_sample_images(category)
+
     images = []
-    
-    if category in STOCK_PHOTOS:
-        for url in STOCK_PHOTOS[category]:
-            try:
-                response = requests.get(url)
-                image = Image.open(io.BytesIO(response.content))
-                images.append(image)
-            except Exception as e:
-                print(f"Error loading image from {url}: {str(e)}")
+    for url in STOCK_PHOTOS.get(category, []):
+        path = sample_image_path(url)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+
+        with _images_lock:
+            cached = _images.get(path)
+        if cached is not None and cached[0] == mtime:
+            images.append(cached[1])
+            continue
+
+        try:
+            image = Image.open(path)
+            image.load()
+        except Exception as e:
+            print(f"Error loading sample image {path}: {str(e)}")
+            continue
+        with _images_lock:
+            _images[path] = (mtime, image)
+        images.append(image)
     
     return images
 
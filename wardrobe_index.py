@@ -0,0 +1,185 @@
+import threading
+from cache import VersionWatch
+from database import (DEFAULT_SECTION, get_clothing_items, parse_color_info, parse_occasions, register_item_listener,
+                      register_item_delete_listener)
+
+def parse_item_attributes(item):
+    """
+    Extract the filterable attributes of a clothing item record
+
+    Args:
+        item (tuple): Clothing item record (id, name, category, color, occasion, filename, date_added)
+
+    Returns:
+        dict: Section, list of seasons and list of occasions for the item
+    """
+    color_info = parse_color_info(item[3])
+    return {
+        "section": color_info["section"] or DEFAULT_SECTION,
+        "seasons": color_info["seasons"],
+        "occasions": parse_occasions(item[4])
+    }
+
+class WardrobeIndex:
+    """
+    In-memory index of the wardrobe
+
+    Keeps every clothing item record by ID together with posting lists of item
+    IDs per category, section, occasion and season, so lookups cost
+    O(matches) instead of a scan of the whole clothing_items table.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.items = {}
+        self.by_category = {}
+        self.by_section = {}
+        self.by_occasion = {}
+        self.by_season = {}
+        self.loaded = False
+
+    def load(self, items=None):
+        """
+        (Re)build the index from the database
+
+        Args:
+            items (list, optional): Clothing item records to index instead of querying the database
+        """
+        if items is None:
+            items = get_clothing_items()
+
+        with self._lock:
+            self.items = {}
+            self.by_category = {}
+            self.by_section = {}
+            self.by_occasion = {}
+            self.by_season = {}
+            for item in items:
+                self.add_item(item)
+            self.loaded = True
+
+    def add_item(self, item):
+        """Add or replace a single clothing item record"""
+        with self._lock:
+            item_id = item[0]
+            if item_id in self.items:
+                self.remove_item(item_id)
+
+            attributes = parse_item_attributes(item)
+            self.items[item_id] = item
+            self.by_category.setdefault(item[2], set()).add(item_id)
+            self.by_section.setdefault(attributes["section"], set()).add(item_id)
+            for occasion in attributes["occasions"]:
+                self.by_occasion.setdefault(occasion, set()).add(item_id)
+            for season in attributes["seasons"]:
+                self.by_season.setdefault(season, set()).add(item_id)
+
+    def remove_item(self, item_id):
+        """Remove a clothing item from the index"""
+        with self._lock:
+            item = self.items.pop(item_id, None)
+            if item is None:
+                return
+
+            for postings in (self.by_category, self.by_section, self.by_occasion, self.by_season):
+                for key in [key for key, ids in postings.items() if item_id in ids]:
+                    postings[key].discard(item_id)
+                    if not postings[key]:
+                        del postings[key]
+
+    def get(self, item_id):
+        """Get a clothing item record by ID, or None"""
+        return self.items.get(item_id)
+
+    def find_ids(self, category=None, section=None, occasion=None, season=None):
+        """
+        Get the IDs of the items matching every given filter
+
+        Args:
+            category (str, optional): Category to match
+            section (str, optional): Section to match
+            occasion (str, optional): Occasion to match
+            season (str, optional): Season to match
+
+        Returns:
+            set: Matching item IDs
+        """
+        with self._lock:
+            postings = []
+            for lookup, key in ((self.by_category, category), (self.by_section, section),
+                                (self.by_occasion, occasion), (self.by_season, season)):
+                if key is not None:
+                    postings.append(lookup.get(key, set()))
+
+            if not postings:
+                return set(self.items)
+
+            # Intersect starting from the shortest posting list
+            postings.sort(key=len)
+            result = set(postings[0])
+            for ids in postings[1:]:
+                result &= ids
+            return result
+
+    def find(self, category=None, section=None, occasion=None, season=None):
+        """
+        Get the clothing item records matching every given filter, newest first
+
+        Returns:
+            list: Matching clothing item records
+        """
+        with self._lock:
+            ids = self.find_ids(category, section, occasion, season)
+            items = [self.items[item_id] for item_id in ids]
+        return sorted(items, key=lambda item: (item[6], item[0]), reverse=True)
+
+    def categories(self):
+        """Get the categories present in the wardrobe"""
+        with self._lock:
+            return sorted(self.by_category)
+
+    def sections(self):
+        """Get the sections present in the wardrobe"""
+        with self._lock:
+            return sorted(self.by_section)
+
+    def occasions(self):
+        """Get the occasions present in the wardrobe"""
+        with self._lock:
+            return sorted(self.by_occasion)
+
+    def seasons(self):
+        """Get the seasons present in the wardrobe"""
+        with self._lock:
+            return sorted(self.by_season)
+
+    def __len__(self):
+        return len(self.items)
+
+_index = None
+_index_watch = None
+_index_lock = threading.Lock()
+
+def get_wardrobe_index():
+    """
+    Get the process-wide wardrobe index
+
+    The index is loaded from the database on first use and kept up to date
+    as clothing items are saved and deleted through the database module.
+    Changes made by other processes are picked up by reloading the index
+    when the clothing_items version counter moves.
+    """
+    global _index, _index_watch
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = WardrobeIndex()
+                _index_watch = VersionWatch("clothing_items")
+                _index_watch.sync()
+                index.load()
+                register_item_listener(index.add_item)
+                register_item_delete_listener(index.remove_item)
+                _index = index
+    elif _index_watch.changed():
+        _index.load()
+    return _index